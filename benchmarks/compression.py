@@ -0,0 +1,45 @@
+import gzip
+import timeit
+
+from benchmarks.response_formats import sample_menu, sample_orders
+from util.response import json_encoder
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Usage: python -m benchmarks.compression
+
+
+def compressors():
+
+    for level in (1, 6, 9):
+        yield f"gzip -{level}", lambda body, level=level: gzip.compress(
+            body, level, mtime=0
+        )
+
+    if brotli is not None:
+        for quality in (1, 5, 11):
+            yield f"br q{quality}", lambda body, quality=quality: brotli.compress(
+                body, quality=quality
+            )
+
+
+def run(number=200):
+
+    for name, payload in (("menu", sample_menu()), ("orders", sample_orders())):
+        body = json_encoder.encode(payload)
+        print(f"{name:<8}{'identity':<10}{len(body):>8} bytes")
+
+        for label, compress in compressors():
+            size = len(compress(body))
+            seconds = timeit.timeit(lambda: compress(body), number=number)
+            print(
+                f"{name:<8}{label:<10}{size:>8} bytes"
+                f"{size / len(body):>8.1%}{seconds / number * 1e6:>10.1f} us/compress"
+            )
+
+
+if __name__ == "__main__":
+    run()
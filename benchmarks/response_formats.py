@@ -0,0 +1,73 @@
+import timeit
+
+from datetime import datetime
+from decimal import Decimal
+
+from schemas.response.order import (
+    OrderItemResponse,
+    OrderListResponse,
+    OrderResponse,
+)
+from schemas.response.pizza import PizzaResponse, PizzaSizeResponse
+from util.response import encoders
+
+# Usage: python -m benchmarks.response_formats
+
+
+def sample_menu(count=30):
+
+    return [
+        PizzaResponse(
+            name=f"Pizza {index}",
+            ingredients="tomato sauce, mozzarella, basil, olive oil",
+            id=index,
+            photo_url=f"https://bucket.s3.eu-central-1.amazonaws.com/{index}.png",
+            sizes=[
+                PizzaSizeResponse(
+                    size=size, grammage=450, price=Decimal("12.50"), id=index, rating="17"
+                )
+                for size in ("s", "m", "l", "j")
+            ],
+        )
+        for index in range(count)
+    ]
+
+
+def sample_orders(count=100):
+
+    return OrderListResponse(
+        orders=[
+            OrderResponse(
+                id=index,
+                total_price=Decimal("37.50"),
+                created_on=datetime(2024, 10, 18, 12, 30, 15, 123456),
+                status="pending",
+                items=[
+                    OrderItemResponse(
+                        quantity=2, name="Margherita", size="m", price=Decimal("12.50")
+                    ),
+                    OrderItemResponse(
+                        quantity=1, name="Capricciosa", size="l", price=Decimal("12.50")
+                    ),
+                ],
+            )
+            for index in range(count)
+        ],
+        next_cursor="MjAyNC0xMC0xOFQxMjozMDoxNS4xMjM0NTZ8MTAw",
+    )
+
+
+def run(number=2000):
+
+    for name, payload in (("menu", sample_menu()), ("orders", sample_orders())):
+        for mimetype, encoder in encoders.items():
+            size = len(encoder.encode(payload))
+            seconds = timeit.timeit(lambda: encoder.encode(payload), number=number)
+            print(
+                f"{name:<8}{mimetype:<22}{size:>8} bytes"
+                f"{seconds / number * 1e6:>10.1f} us/encode"
+            )
+
+
+if __name__ == "__main__":
+    run()
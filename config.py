@@ -4,6 +4,7 @@ from decouple import config
 from flask import Flask
 from flask_migrate import Migrate
 from flask_restful import Api
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 from db import db
 from resources.routes import routes
@@ -53,6 +54,12 @@ def create_app(environment):
     app = Flask(__name__)
     app.config.from_object(environment)
 
+    # Behind a load balancer or reverse proxy the client address is taken from
+    # X-Forwarded-For, trusting as many entries as there are proxies
+    app.wsgi_app = ProxyFix(
+        app.wsgi_app, x_for=config("TRUSTED_PROXY_HOPS", default=0, cast=int)
+    )
+
     db.init_app(app)
     migrate = Migrate(app, db)
     api = Api(app)
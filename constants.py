@@ -1,4 +1,3 @@
 import os
 
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
-TEMP_FILE_FOLDER = os.path.join(ROOT_DIR, "temp_files")
@@ -4,22 +4,35 @@ import jwt
 
 from decouple import config
 from flask_httpauth import HTTPTokenAuth
+from sqlalchemy import func
 from werkzeug.exceptions import Unauthorized
 
 from db import db
+from models.enums import RolesEnum
+from models.token_revocation import TokenRevocationModel
 from models.user import UserModel
+from util.cache import principal_cache, revocation_list
+
+# Minimum version used to revoke every token of a deleted user
+REVOKE_ALL = 2**31 - 1
 
 
 class AuthManager:
+    role_tokens = config("ROLE_TOKENS", default=False, cast=bool)
+    token_lifetime = timedelta(hours=2)
 
     @staticmethod
     def encode_token(user: type[UserModel]):
 
         payload = {
-            "exp": datetime.now(timezone.utc) + timedelta(hours=2),
+            "exp": datetime.now(timezone.utc) + AuthManager.token_lifetime,
             "sub": user.id,
         }
 
+        if AuthManager.role_tokens:
+            payload["role"] = user.role.name
+            payload["ver"] = user.token_version
+
         token = jwt.encode(payload, config("SECRET_KEY"), algorithm="HS256")
 
         return token
@@ -32,7 +45,43 @@ class AuthManager:
         except Exception as ex:
             raise ex
 
-        return payload["sub"]
+        return payload
+
+    @staticmethod
+    def revoke_tokens(user_id: int, min_version: int = REVOKE_ALL):
+
+        # A revocation is only needed while the tokens it covers can still be valid
+        db.session.execute(
+            db.delete(TokenRevocationModel).where(
+                TokenRevocationModel.expires_on <= func.now()
+            )
+        )
+        db.session.add(
+            TokenRevocationModel(
+                user_id=user_id,
+                min_version=min_version,
+                expires_on=func.now() + AuthManager.token_lifetime,
+            )
+        )
+        revocation_list.revoke(user_id, min_version)
+
+
+class Principal:
+
+    def __init__(self, id: int, role: RolesEnum, phone: str):
+        self.id = id
+        self.role = role
+        self.phone = phone
+
+    @property
+    def user(self):
+
+        # The full model is only loaded by the handlers that need it
+        user = db.session.get(UserModel, self.id)
+        if user is None:
+            raise Unauthorized("Invalid or missing token")
+
+        return user
 
 
 auth = HTTPTokenAuth(scheme="Bearer")
@@ -41,11 +90,29 @@ auth = HTTPTokenAuth(scheme="Bearer")
 @auth.verify_token
 def verify_token(token):
     try:
-        user_id = AuthManager.decode_token(token)
-        user = db.session.execute(
-            db.select(UserModel).filter_by(id=user_id)
-        ).scalar_one()
+        payload = AuthManager.decode_token(token)
+        user_id = payload["sub"]
+
+        # Role-bearing tokens are authorized without a database lookup,
+        # unless the user changed the password or was deleted since
+        if AuthManager.role_tokens and "role" in payload:
+            if revocation_list.is_revoked(user_id, payload["ver"]):
+                raise Unauthorized("Invalid or missing token")
+
+            return Principal(user_id, RolesEnum[payload["role"]], None)
+
+        principal = principal_cache.get(user_id)
+
+        if principal is None:
+            principal = Principal(
+                *db.session.execute(
+                    db.select(UserModel.id, UserModel.role, UserModel.phone).filter_by(
+                        id=user_id
+                    )
+                ).one()
+            )
+            principal_cache.set(user_id, principal)
     except Exception as ex:
         raise Unauthorized("Invalid or missing token")
 
-    return user
+    return principal
@@ -1,29 +1,135 @@
+from datetime import timezone
+
 from decouple import config
+from sqlalchemy import func, tuple_
 from sqlalchemy.exc import NoResultFound
+from sqlalchemy.orm import load_only, selectinload
 from werkzeug.exceptions import Conflict, InternalServerError, NotFound
 
 from db import db
+from managers.auth import Principal
+from managers.outbox import OutboxManager
 from managers.pizza import PizzaManager
-from models.enums import RolesEnum, StatusEnum
+from managers.rating import RatingManager
+from models.enums import OutboxKindEnum, RolesEnum, StatusEnum
 from models.order import OrderModel
 from models.order_item import OrderItemModel
 from models.pizza import PizzaModel
+from models.pizza_size import PizzaSizeModel
 from models.unpaid_order import UnpaidOrderModel
 from models.unpaid_order_item import UnpaidOrderItemModel
-from models.user import UserModel
 from services.paypal_service import PayPalPayment
-from services.twilio_service import twilio_notify
+from util.helper import decode_cursor, encode_cursor
+
+
+# Loads the items of the selected orders together with their sizes and pizza
+# names in a single extra statement, instead of lazy loading them per item
+order_items_loader = (
+    selectinload(OrderModel.items)
+    .joinedload(OrderItemModel.pizza_size, innerjoin=True)
+    .joinedload(PizzaSizeModel.pizza, innerjoin=True)
+)
+
+
+def catalog_version():
+
+    # Item names and prices come from the catalog, so its changes are part of
+    # an order's version. The size count catches deleted pizzas and sizes.
+    return (
+        func.greatest(
+            db.select(func.max(PizzaModel.updated_on)).scalar_subquery(),
+            db.select(func.max(PizzaSizeModel.updated_on)).scalar_subquery(),
+        ),
+        db.select(func.count(PizzaSizeModel.id)).scalar_subquery(),
+    )
+
+
+def order_load_options(fields):
+
+    if fields is None:
+        return [order_items_loader]
+
+    # The sort keys are always loaded, they are needed for the next cursor
+    columns = (fields - {"items"}) | {"id", "created_on"}
+    options = [load_only(*(getattr(OrderModel, column) for column in columns))]
+    if "items" in fields:
+        options.append(order_items_loader)
+
+    return options
 
 
 class OrderManager:
 
     @staticmethod
-    def get_orders(user: UserModel):
+    def filter_orders(query, user: Principal, filters):
 
         if user.role == RolesEnum.customer:
-            return user.orders
+            query = query.filter_by(user_id=user.id)
+        if "status" in filters:
+            query = query.filter_by(status=filters["status"])
+        if "created_from" in filters:
+            query = query.where(OrderModel.created_on >= filters["created_from"])
+        if "created_to" in filters:
+            query = query.where(OrderModel.created_on <= filters["created_to"])
+        if "cursor" in filters:
+            created_on, order_id = decode_cursor(filters["cursor"])
+            query = query.where(
+                tuple_(OrderModel.created_on, OrderModel.id) < (created_on, order_id)
+            )
 
-        return db.session.execute(db.select(OrderModel)).scalars().fetchall()
+        return query
+
+    @staticmethod
+    def get_orders(user: Principal, filters, fields=None):
+
+        query = OrderManager.filter_orders(
+            db.select(OrderModel)
+            .options(*order_load_options(fields))
+            .order_by(OrderModel.created_on.desc(), OrderModel.id.desc()),
+            user,
+            filters,
+        )
+
+        limit = filters["limit"]
+        orders = db.session.execute(query.limit(limit + 1)).scalars().fetchall()
+
+        next_cursor = None
+        if len(orders) > limit:
+            orders = orders[:limit]
+            next_cursor = encode_cursor(orders[-1].created_on, orders[-1].id)
+
+        return orders, next_cursor
+
+    @staticmethod
+    def get_orders_version(user: Principal, filters):
+
+        # Versions the requested page only, read with the same keyset index
+        # scan as the page. The extra row shows whether the next cursor changed.
+        return db.session.execute(
+            OrderManager.filter_orders(
+                db.select(OrderModel.id, OrderModel.updated_on, *catalog_version())
+                .order_by(OrderModel.created_on.desc(), OrderModel.id.desc())
+                .limit(filters["limit"] + 1),
+                user,
+                filters,
+            )
+        ).all()
+
+    @staticmethod
+    def get_order_version(order_id):
+
+        updated_on, size_count = catalog_version()
+
+        try:
+            updated_on, size_count = db.session.execute(
+                db.select(
+                    func.greatest(OrderModel.updated_on, updated_on), size_count
+                ).filter_by(id=order_id)
+            ).one()
+        except NoResultFound:
+            raise NotFound("Order not found")
+
+        return updated_on.replace(tzinfo=timezone.utc), size_count
 
     @staticmethod
     def delete_orders():
@@ -32,40 +138,42 @@ class OrderManager:
         db.session.flush()
 
     @staticmethod
-    def get_order(order_id):
+    def get_order(order_id, with_items=False, fields=None):
+
+        query = db.select(OrderModel).filter_by(id=order_id)
+        if with_items:
+            query = query.options(*order_load_options(fields))
 
         try:
-            order = db.session.execute(
-                db.select(OrderModel).filter_by(id=order_id)
-            ).scalar_one()
+            order = db.session.execute(query).scalar_one()
         except NoResultFound:
             raise NotFound("Order not found")
 
         return order
 
     @staticmethod
-    def create_order(user: UserModel, data):
+    def create_order(user: Principal, data):
 
         unpaid_order_items = []
         total_price = 0
 
-        for product in data["products"]:
-            try:
-                pizza = db.session.execute(
-                    db.select(PizzaModel).filter_by(name=product["name"])
-                ).scalar_one()
+        rows = PizzaManager.get_pizza_sizes({p["name"] for p in data["products"]})
+        pizza_names = {row.name for row in rows}
+        pizza_sizes = {
+            (row.name, row.size): row for row in rows if row.size is not None
+        }
 
-                pizza_size = [p for p in pizza.sizes if p.size.name == product["size"]][
-                    0
-                ]
-            except NoResultFound:
+        for product in data["products"]:
+            if product["name"] not in pizza_names:
                 raise NotFound(f"Pizza '{product["name"]}' not found")
-            except IndexError:
+
+            pizza_size = pizza_sizes.get((product["name"], product["size"]))
+            if pizza_size is None:
                 raise NotFound(
-                    f"Size '{product["size"]}' for pizza '{product["name"]}' is not available yet"
+                    f"Size '{product["size"].name}' for pizza '{product["name"]}' is not available yet"
                 )
 
-            quantity = int(product["quantity"])
+            quantity = product["quantity"]
             unpaid_order_item = UnpaidOrderItemModel(
                 pizza_size_id=pizza_size.id, quantity=quantity
             )
@@ -78,17 +186,33 @@ class OrderManager:
         )
         db.session.add(unpaid_order)
         db.session.flush()
+        unpaid_order_id = unpaid_order.id
 
-        payment = PayPalPayment.create_payment(total_price, unpaid_order.id)
-        if payment.create():
+        # Commit before calling PayPal, so that the connection goes back to the
+        # pool instead of idling in an open transaction during the HTTPS call
+        db.session.commit()
+
+        try:
+            payment = PayPalPayment.create_payment(total_price, unpaid_order_id)
+            created = payment.create()
+        except Exception:
+            OrderManager.discard_unpaid_order(unpaid_order_id)
+            raise
+
+        if created:
             return {
                 "message": "Order created and payment initiated",
                 "approval_url": payment["links"][1]["href"],
             }
-        else:
-            db.session.rollback()
-            db.session.remove()
-            raise Conflict("A conflict occurred while creating the order")
+
+        OrderManager.discard_unpaid_order(unpaid_order_id)
+        raise Conflict("A conflict occurred while creating the order")
+
+    @staticmethod
+    def discard_unpaid_order(unpaid_order_id):
+
+        db.session.execute(db.delete(UnpaidOrderModel).filter_by(id=unpaid_order_id))
+        db.session.commit()
 
     @staticmethod
     def capture_payment(data):
@@ -103,15 +227,16 @@ class OrderManager:
             except NoResultFound:
                 raise NotFound("No order details available")
 
-            order_items = []
-            for product in unpaid_order.items:
-                pizza_size = PizzaManager.get_pizza(product.pizza_size_id, size=True)
-                pizza_size.rating += product.quantity
-                order_item = OrderItemModel(
+            RatingManager.add_ratings(
+                {product.pizza_size_id: product.quantity for product in unpaid_order.items}
+            )
+
+            order_items = [
+                OrderItemModel(
                     pizza_size_id=product.pizza_size_id, quantity=product.quantity
                 )
-
-                order_items.append(order_item)
+                for product in unpaid_order.items
+            ]
 
             order = OrderModel(
                 user_id=unpaid_order.user_id,
@@ -150,7 +275,11 @@ class OrderManager:
             message = f"Order #{order.id} has been submitted for delivery"
             phone = order.user.phone
             # Use verified phone for testing purposes
-            twilio_notify.send_notification(config("TWILIO_VERIFIED_NUMBER"), message)
+            OutboxManager.enqueue(
+                OutboxKindEnum.sms,
+                recipient=config("TWILIO_VERIFIED_NUMBER"),
+                message=message,
+            )
 
     @staticmethod
     def delete_order(order_id):
@@ -0,0 +1,157 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from decouple import config
+from sqlalchemy import func
+
+from db import db
+from models.enums import OutboxKindEnum, OutboxStatusEnum
+from models.outbox_message import OutboxMessageModel
+from services.ses_service import ses_email
+from services.twilio_service import twilio_notify
+
+
+def send_emails(payloads):
+
+    results = ses_email.send_emails(
+        [
+            (payload["recipient"], payload["subject"], payload["content"])
+            for payload in payloads
+        ]
+    )
+
+    return [result["error"] for result in results]
+
+
+def send_sms(payloads):
+
+    results = twilio_notify.send_notifications(
+        [(payload["recipient"], payload["message"]) for payload in payloads]
+    )
+
+    return [result["error"] for result in results]
+
+
+# Each transport sends a batch of payloads and returns one error per payload,
+# None when the payload was delivered
+transports = {
+    OutboxKindEnum.email: send_emails,
+    OutboxKindEnum.sms: send_sms,
+}
+
+
+class OutboxManager:
+
+    batch_size = config("OUTBOX_BATCH_SIZE", default=50, cast=int)
+    max_attempts = config("OUTBOX_MAX_ATTEMPTS", default=5, cast=int)
+    retry_backoff = config("OUTBOX_RETRY_BACKOFF", default=5, cast=int)
+    lease = config("OUTBOX_LEASE", default=60, cast=int)
+    retention = config("OUTBOX_RETENTION", default=86400, cast=int)
+    purge_batch_size = config("OUTBOX_PURGE_BATCH_SIZE", default=1000, cast=int)
+
+    @staticmethod
+    def enqueue(kind: OutboxKindEnum, **payload):
+
+        db.session.add(OutboxMessageModel(kind=kind, payload=payload))
+        db.session.flush()
+
+    @staticmethod
+    def claim_messages():
+
+        messages = db.session.execute(
+            db.select(
+                OutboxMessageModel.id,
+                OutboxMessageModel.kind,
+                OutboxMessageModel.payload,
+                OutboxMessageModel.attempts,
+            )
+            .filter_by(status=OutboxStatusEnum.pending)
+            .where(OutboxMessageModel.next_attempt_on <= func.now())
+            .order_by(OutboxMessageModel.id)
+            .limit(OutboxManager.batch_size)
+            .with_for_update(skip_locked=True)
+        ).fetchall()
+
+        # Lease the claimed messages, so that other workers skip them while
+        # they are being sent outside of the transaction
+        if messages:
+            db.session.execute(
+                db.update(OutboxMessageModel)
+                .where(OutboxMessageModel.id.in_([m.id for m in messages]))
+                .values(
+                    next_attempt_on=func.now()
+                    + timedelta(seconds=OutboxManager.lease)
+                )
+            )
+        db.session.commit()
+
+        return messages
+
+    @staticmethod
+    def send_messages(messages, transport):
+
+        try:
+            return transport([message.payload for message in messages])
+        except Exception as ex:
+            return [str(ex)] * len(messages)
+
+    @staticmethod
+    def process_messages(transports=transports):
+
+        messages = OutboxManager.claim_messages()
+        if not messages:
+            return 0
+
+        batches = defaultdict(list)
+        for message in messages:
+            batches[message.kind].append(message)
+
+        errors = {}
+        for kind, batch in batches.items():
+            batch_errors = OutboxManager.send_messages(batch, transports[kind])
+            errors.update(zip([message.id for message in batch], batch_errors))
+
+        for message in messages:
+            error = errors[message.id]
+            values = {"attempts": message.attempts + 1}
+
+            if error is None:
+                values["status"] = OutboxStatusEnum.sent
+            elif message.attempts + 1 >= OutboxManager.max_attempts:
+                values["status"] = OutboxStatusEnum.failed
+                values["last_error"] = error
+            else:
+                delay = OutboxManager.retry_backoff * 2**message.attempts
+                values["next_attempt_on"] = func.now() + timedelta(seconds=delay)
+                values["last_error"] = error
+
+            db.session.execute(
+                db.update(OutboxMessageModel).filter_by(id=message.id).values(**values)
+            )
+        db.session.commit()
+
+        return len(messages)
+
+    @staticmethod
+    def purge_messages():
+
+        # Sent messages are only kept for a while, so the table and its
+        # status index don't grow with every message ever sent
+        batch = (
+            db.select(OutboxMessageModel.id)
+            .filter_by(status=OutboxStatusEnum.sent)
+            .where(
+                OutboxMessageModel.updated_on
+                <= func.now() - timedelta(seconds=OutboxManager.retention)
+            )
+            .order_by(OutboxMessageModel.id)
+            .limit(OutboxManager.purge_batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        purged = db.session.execute(
+            db.delete(OutboxMessageModel).where(OutboxMessageModel.id.in_(batch))
+        ).rowcount
+        db.session.commit()
+
+        return purged
@@ -0,0 +1,278 @@
+import io
+
+from datetime import timedelta
+
+from decouple import config
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from werkzeug.exceptions import BadRequest
+
+from db import db
+from models.enums import PhotoStatusEnum
+from models.photo import PhotoModel
+from models.photo_upload import PhotoUploadModel
+from models.pizza import PizzaModel
+from services.s3_service import s3_store
+from util.executor import image_pool
+from util.photo import PhotoStream, photo_content_types, render_variants, variant_key
+
+
+class PhotoManager:
+
+    async_upload = config("PHOTO_ASYNC_UPLOAD", default=False, cast=bool)
+    batch_size = config("PHOTO_UPLOAD_BATCH_SIZE", default=5, cast=int)
+    max_attempts = config("PHOTO_UPLOAD_MAX_ATTEMPTS", default=5, cast=int)
+    retry_backoff = config("PHOTO_UPLOAD_RETRY_BACKOFF", default=5, cast=int)
+    lease = config("PHOTO_UPLOAD_LEASE", default=300, cast=int)
+    gc_grace = config("PHOTO_GC_GRACE", default=86400, cast=int)
+    gc_batch_size = config("PHOTO_GC_BATCH_SIZE", default=100, cast=int)
+
+    @staticmethod
+    def read_photo(encoded_photo, photo_extension):
+
+        photo = PhotoStream(encoded_photo)
+        if photo.extension != photo_extension:
+            raise BadRequest(f"Photo is not a valid {photo_extension} image")
+
+        return photo
+
+    @staticmethod
+    def find_photo(key):
+
+        # A stored photo is reused, and taken back from the garbage collector
+        # if it was orphaned
+        return db.session.execute(
+            db.update(PhotoModel)
+            .filter_by(key=key)
+            .values(orphaned_on=None)
+            .returning(PhotoModel.url, PhotoModel.variants)
+        ).first()
+
+    @staticmethod
+    def upload_photo(fileobj, source, key, content_type):
+
+        # Resizing is CPU bound, so it runs in a separate process and the
+        # original is uploaded together with its variants. The source sent to
+        # the process is the base64 text of a request photo, so the request
+        # never holds a decoded copy, or the bytes of a staged photo.
+        variants = image_pool.run(render_variants, source)
+        urls = s3_store.upload_photos(
+            [(fileobj, key, content_type)]
+            + [
+                (
+                    io.BytesIO(data),
+                    variant_key(key, variant, extension),
+                    photo_content_types[extension],
+                )
+                for (variant, extension), data in variants.items()
+            ]
+        )
+
+        photo_url, photos = urls[0], {}
+        for (variant, extension), url in zip(variants, urls[1:]):
+            photos.setdefault(variant, {})[extension] = url
+
+        db.session.execute(
+            insert(PhotoModel)
+            .values(key=key, url=photo_url, content_type=content_type, variants=photos)
+            .on_conflict_do_nothing(index_elements=[PhotoModel.key])
+        )
+
+        return photo_url, photos
+
+    @staticmethod
+    def release_photo(photo_url):
+
+        # Only marked here, the garbage collector checks that no pizza uses
+        # the photo before it is deleted
+        if photo_url:
+            db.session.execute(
+                db.update(PhotoModel)
+                .filter_by(url=photo_url, orphaned_on=None)
+                .values(orphaned_on=func.now())
+            )
+
+    @staticmethod
+    def set_photo(pizza: PizzaModel, encoded_photo, photo_extension):
+
+        photo = PhotoManager.read_photo(encoded_photo, photo_extension)
+        photo_key = f"{photo.digest()}.{photo.extension}"
+
+        if pizza.id is not None:
+            db.session.execute(db.delete(PhotoUploadModel).filter_by(pizza_id=pizza.id))
+
+        stored = PhotoManager.find_photo(photo_key)
+
+        # New photos are staged with the pizza and resized and uploaded by
+        # the worker, the previous photo is kept until then
+        if stored is None and PhotoManager.async_upload:
+            db.session.add(pizza)
+            db.session.flush()
+            db.session.add(
+                PhotoUploadModel(
+                    pizza_id=pizza.id,
+                    key=photo_key,
+                    content_type=photo.content_type,
+                    content=photo.read(),
+                )
+            )
+            pizza.photo_status = PhotoStatusEnum.pending
+            return
+
+        if stored is None:
+            stored = PhotoManager.upload_photo(
+                photo, photo.encoded, photo_key, photo.content_type
+            )
+
+        if pizza.photo_url != stored[0]:
+            PhotoManager.release_photo(pizza.photo_url)
+        pizza.photo_url, pizza.photos = stored
+        pizza.photo_status = PhotoStatusEnum.ready
+
+    @staticmethod
+    def claim_uploads():
+
+        uploads = db.session.execute(
+            db.select(
+                PhotoUploadModel.id,
+                PhotoUploadModel.pizza_id,
+                PhotoUploadModel.key,
+                PhotoUploadModel.content_type,
+                PhotoUploadModel.content,
+                PhotoUploadModel.attempts,
+            )
+            .where(PhotoUploadModel.next_attempt_on <= func.now())
+            .order_by(PhotoUploadModel.id)
+            .limit(PhotoManager.batch_size)
+            .with_for_update(skip_locked=True)
+        ).fetchall()
+
+        if uploads:
+            db.session.execute(
+                db.update(PhotoUploadModel)
+                .where(PhotoUploadModel.id.in_([u.id for u in uploads]))
+                .values(
+                    next_attempt_on=func.now() + timedelta(seconds=PhotoManager.lease)
+                )
+            )
+        db.session.commit()
+
+        return uploads
+
+    @staticmethod
+    def complete_upload(upload, stored=None, error=None):
+
+        if stored is None and upload.attempts + 1 < PhotoManager.max_attempts:
+            delay = PhotoManager.retry_backoff * 2**upload.attempts
+            db.session.execute(
+                db.update(PhotoUploadModel)
+                .filter_by(id=upload.id)
+                .values(
+                    attempts=upload.attempts + 1,
+                    last_error=error,
+                    next_attempt_on=func.now() + timedelta(seconds=delay),
+                )
+            )
+            return
+
+        # An upload replaced by a newer photo or removed with its pizza is no
+        # longer there, and must not overwrite the pizza
+        if not db.session.execute(
+            db.delete(PhotoUploadModel)
+            .filter_by(id=upload.id)
+            .returning(PhotoUploadModel.id)
+        ).first():
+            return
+
+        values = {"photo_status": PhotoStatusEnum.failed}
+        if stored is not None:
+            photo_url, photos = stored
+            values = {
+                "photo_url": photo_url,
+                "photos": photos,
+                "photo_status": PhotoStatusEnum.ready,
+            }
+
+        # The previous photo is only released once the pizza no longer uses it
+        previous = (
+            db.select(PizzaModel.id, PizzaModel.photo_url)
+            .filter_by(id=upload.pizza_id)
+            .with_for_update()
+            .subquery()
+        )
+        previous_url = db.session.execute(
+            db.update(PizzaModel)
+            .where(PizzaModel.id == previous.c.id)
+            .values(**values)
+            .returning(previous.c.photo_url)
+        ).scalar()
+        if stored is not None and previous_url != stored[0]:
+            PhotoManager.release_photo(previous_url)
+
+    @staticmethod
+    def process_uploads():
+
+        uploads = PhotoManager.claim_uploads()
+
+        for upload in uploads:
+            try:
+                stored = PhotoManager.find_photo(
+                    upload.key
+                ) or PhotoManager.upload_photo(
+                    io.BytesIO(upload.content),
+                    upload.content,
+                    upload.key,
+                    upload.content_type,
+                )
+                PhotoManager.complete_upload(upload, stored=stored)
+            except Exception as ex:
+                PhotoManager.complete_upload(upload, error=str(ex))
+        db.session.commit()
+
+        return len(uploads)
+
+    @staticmethod
+    def collect_garbage():
+
+        referenced = db.or_(
+            db.select(PizzaModel.id)
+            .where(PizzaModel.photo_url == PhotoModel.url)
+            .exists(),
+            db.select(PhotoUploadModel.id)
+            .where(PhotoUploadModel.key == PhotoModel.key)
+            .exists(),
+        )
+
+        # Orphans that were put back on a pizza in the meantime are kept
+        db.session.execute(
+            db.update(PhotoModel)
+            .where(PhotoModel.orphaned_on.is_not(None), referenced)
+            .values(orphaned_on=None)
+        )
+
+        photos = db.session.execute(
+            db.select(PhotoModel.id, PhotoModel.key, PhotoModel.variants)
+            .where(
+                PhotoModel.orphaned_on
+                <= func.now() - timedelta(seconds=PhotoManager.gc_grace),
+                db.not_(referenced),
+            )
+            .limit(PhotoManager.gc_batch_size)
+            .with_for_update(skip_locked=True)
+        ).fetchall()
+
+        # The rows stay locked while the objects are deleted, so a pizza that
+        # reuses one of the photos waits and then uploads it again
+        keys = []
+        for photo in photos:
+            keys.append(photo.key)
+            for variant, urls in (photo.variants or {}).items():
+                keys.extend(variant_key(photo.key, variant, extension) for extension in urls)
+        s3_store.delete_photos(keys)
+
+        db.session.execute(
+            db.delete(PhotoModel).where(PhotoModel.id.in_([p.id for p in photos]))
+        )
+        db.session.commit()
+
+        return len(photos)
@@ -1,17 +1,13 @@
-import os
-
-from datetime import datetime, timezone
-from uuid import uuid4
-
+from sqlalchemy import case
 from sqlalchemy.exc import IntegrityError, NoResultFound
+from sqlalchemy.orm import selectinload
 from werkzeug.exceptions import Conflict, NotFound
 
-from constants import TEMP_FILE_FOLDER
 from db import db
+from managers.photo import PhotoManager
 from models.pizza import PizzaModel
 from models.pizza_size import PizzaSizeModel
-from services.s3_service import s3_store
-from util.helper import decode_photo
+from util.cache import menu_cache
 
 
 class PizzaManager:
@@ -19,13 +15,42 @@ class PizzaManager:
     @staticmethod
     def get_pizzas():
 
-        pizzas = db.session.execute(db.select(PizzaModel)).scalars().fetchall()
+        pizzas = (
+            db.session.execute(
+                db.select(PizzaModel).options(selectinload(PizzaModel.sizes))
+            )
+            .scalars()
+            .fetchall()
+        )
         return pizzas
 
+    @staticmethod
+    def get_pizza_sizes(names):
+
+        # Pizzas without sizes are kept by the outer join, with a NULL size
+        return db.session.execute(
+            db.select(
+                PizzaModel.name,
+                PizzaSizeModel.size,
+                PizzaSizeModel.id,
+                PizzaSizeModel.price,
+            )
+            .select_from(PizzaModel)
+            .outerjoin(PizzaModel.sizes)
+            .where(PizzaModel.name.in_(names))
+        ).all()
+
+    @staticmethod
+    def name_exists(name):
+
+        return db.session.execute(
+            db.select(db.select(PizzaModel.id).filter_by(name=name).exists())
+        ).scalar()
+
     @staticmethod
     def create_pizza(data):
 
-        if data["name"] in [p.name for p in PizzaManager.get_pizzas()]:
+        if PizzaManager.name_exists(data["name"]):
             raise Conflict("Pizza with the same name already exists")
 
         data["ingredients"] = [
@@ -33,16 +58,13 @@ class PizzaManager:
         ]
         encoded_photo = data.pop("photo")
         photo_extension = data.pop("photo_extension")
-        photo_name = (
-            f"{uuid4()}_{datetime.now(timezone.utc).timestamp()}.{photo_extension}"
-        )
-        path = os.path.join(TEMP_FILE_FOLDER, f"{photo_name}")
-        decode_photo(path, encoded_photo)
-        data["photo_url"] = s3_store.upload_photo(path, photo_name, photo_extension)
         pizza = PizzaModel(**data)
+        PhotoManager.set_photo(pizza, encoded_photo, photo_extension)
         db.session.add(pizza)
         db.session.flush()
-        os.remove(path)
+        menu_cache.invalidate()
+
+        return pizza
 
     @staticmethod
     def add_pizza_size(data):
@@ -57,55 +79,84 @@ class PizzaManager:
             pizza.sizes.append(pizza_size)
             db.session.add(pizza)
             db.session.flush()
+            menu_cache.invalidate()
         except NoResultFound:
             raise NotFound("Pizza not found")
         except IntegrityError:
             raise Conflict(
-                f"Size '{data["size"]}' for pizza '{pizza_name}' already exists"
+                f"Size '{data["size"].name}' for pizza '{pizza_name}' already exists"
             )
 
     @staticmethod
     def get_pizza(pizza_id, size=False):
 
-        model = PizzaSizeModel if size else PizzaModel
+        query = (
+            db.select(PizzaSizeModel)
+            if size
+            else db.select(PizzaModel).options(selectinload(PizzaModel.sizes))
+        )
 
         try:
-            pizza = db.session.execute(
-                db.select(model).filter_by(id=pizza_id)
-            ).scalar_one()
+            pizza = db.session.execute(query.filter_by(id=pizza_id)).scalar_one()
         except NoResultFound:
             raise NotFound("Pizza not found")
 
         return pizza
 
+    @staticmethod
+    def add_ratings(ratings: dict[int, int]):
+
+        pizza_size_ids = sorted(ratings)
+
+        # Lock the rows in a fixed order, so that concurrent captures touching
+        # the same sizes wait for each other instead of deadlocking
+        locked_ids = (
+            db.session.execute(
+                db.select(PizzaSizeModel.id)
+                .where(PizzaSizeModel.id.in_(pizza_size_ids))
+                .order_by(PizzaSizeModel.id)
+                .with_for_update()
+            )
+            .scalars()
+            .fetchall()
+        )
+        if len(locked_ids) != len(pizza_size_ids):
+            raise NotFound("Pizza not found")
+
+        db.session.execute(
+            db.update(PizzaSizeModel)
+            .where(PizzaSizeModel.id.in_(pizza_size_ids))
+            .values(
+                rating=PizzaSizeModel.rating
+                + case(ratings, value=PizzaSizeModel.id, else_=0)
+            )
+            .execution_options(synchronize_session="fetch")
+        )
+
     @staticmethod
     def update_pizza(pizza_id, data, size=False):
 
-        if (not size and "name" in data) and (
-            data["name"] in [p.name for p in PizzaManager.get_pizzas()]
-        ):
+        if (not size and "name" in data) and PizzaManager.name_exists(data["name"]):
             raise Conflict("Pizza with the same name already exists")
 
         pizza = PizzaManager.get_pizza(pizza_id, size)
 
         if "photo" in data:
-            encoded_photo = data.pop("photo")
-            photo_extension = data.pop("photo_extension")
-            photo_name = (
-                f"{uuid4()}_{datetime.now(timezone.utc).timestamp()}.{photo_extension}"
-            )
-            path = os.path.join(TEMP_FILE_FOLDER, f"{photo_name}")
-            decode_photo(path, encoded_photo)
-            data["photo_url"] = s3_store.upload_photo(path, photo_name, photo_extension)
-            os.remove(path)
+            PhotoManager.set_photo(pizza, data.pop("photo"), data.pop("photo_extension"))
 
         for key, value in data.items():
             setattr(pizza, key, value)
         db.session.flush()
+        menu_cache.invalidate()
+
+        return pizza
 
     @staticmethod
     def delete_pizza(pizza_id, size=False):
 
         pizza = PizzaManager.get_pizza(pizza_id, size)
+        if not size:
+            PhotoManager.release_photo(pizza.photo_url)
         db.session.delete(pizza)
         db.session.flush()
+        menu_cache.invalidate()
@@ -0,0 +1,113 @@
+import atexit
+import threading
+
+from collections import defaultdict
+
+from decouple import config
+from flask import current_app
+
+from db import db
+from managers.pizza import PizzaManager
+from models.rating_delta import RatingDeltaModel
+
+
+class RatingManager:
+
+    write_behind = config("RATING_WRITE_BEHIND", default=False, cast=bool)
+    flush_batch_size = config("RATING_FLUSH_BATCH_SIZE", default=1000, cast=int)
+    flush_interval = config("RATING_FLUSH_INTERVAL", default=5, cast=int)
+
+    @staticmethod
+    def add_ratings(ratings: dict[int, int]):
+
+        if not RatingManager.write_behind:
+            PizzaManager.add_ratings(ratings)
+            return
+
+        RatingFlusher.ensure_started(current_app._get_current_object())
+
+        # Appending deltas never waits on the row locks of popular pizza sizes,
+        # they are applied to pizza_sizes by the periodic flush
+        db.session.add_all(
+            [
+                RatingDeltaModel(pizza_size_id=pizza_size_id, delta=delta)
+                for pizza_size_id, delta in ratings.items()
+            ]
+        )
+        db.session.flush()
+
+    @staticmethod
+    def flush_ratings():
+
+        batch = (
+            db.select(RatingDeltaModel.id)
+            .order_by(RatingDeltaModel.id)
+            .limit(RatingManager.flush_batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        deltas = db.session.execute(
+            db.delete(RatingDeltaModel)
+            .where(RatingDeltaModel.id.in_(batch))
+            .returning(RatingDeltaModel.pizza_size_id, RatingDeltaModel.delta)
+        ).fetchall()
+
+        ratings = defaultdict(int)
+        for pizza_size_id, delta in deltas:
+            ratings[pizza_size_id] += delta
+
+        if ratings:
+            PizzaManager.add_ratings(ratings)
+        db.session.commit()
+
+        return len(deltas)
+
+
+class RatingFlusher(threading.Thread):
+
+    def __init__(self, app, interval: int):
+        super().__init__(daemon=True)
+        self.app = app
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    _lock = threading.Lock()
+
+    @classmethod
+    def ensure_started(cls, app):
+
+        # Started by the first buffered rating, so processes that never record
+        # ratings, like the CLI and the worker, don't run a flusher
+        if "rating_flusher" not in app.extensions:
+            with cls._lock:
+                if "rating_flusher" not in app.extensions:
+                    flusher = cls(app, RatingManager.flush_interval)
+                    flusher.start()
+                    atexit.register(flusher.stop)
+                    app.extensions["rating_flusher"] = flusher
+
+    def run(self):
+
+        while not self._stopped.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+
+        with self.app.app_context():
+            try:
+                while RatingManager.flush_ratings():
+                    pass
+            except Exception:
+                db.session.rollback()
+                self.app.logger.exception("Flushing pizza ratings failed")
+            finally:
+                db.session.remove()
+
+    def stop(self):
+
+        if self._stopped.is_set():
+            return
+
+        self._stopped.set()
+        self.join()
+        self.flush()
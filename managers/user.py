@@ -4,9 +4,11 @@ from werkzeug.security import generate_password_hash, check_password_hash
 
 from db import db
 from managers.auth import AuthManager
-from models.enums import RolesEnum
+from managers.outbox import OutboxManager
+from models.enums import OutboxKindEnum, RolesEnum
 from models.user import UserModel
-from services.ses_service import ses_email
+from util.cache import principal_cache
+from util.executor import hash_pool
 
 
 class UserManager:
@@ -18,7 +20,7 @@ class UserManager:
             db.select(UserModel).filter_by(email=data["email"])
         ).scalar()
 
-        if user and check_password_hash(user.password, data["password"]):
+        if user and hash_pool.run(check_password_hash, user.password, data["password"]):
             return AuthManager.encode_token(user)
 
         raise NotFound("User not found")
@@ -29,17 +31,23 @@ class UserManager:
         subject = f"Welcome to our Pizza club, {data["first_name"]}!"
         content = f"We are happy to provide you with a wide selection of delicious pizzas to choose from. Don't be late and order now!\nRegards,\nClub Pizza"
 
+        data["password"] = hash_pool.run(
+            generate_password_hash, data["password"], method="pbkdf2:sha256"
+        )
+
         try:
-            data["password"] = generate_password_hash(
-                data["password"], method="pbkdf2:sha256"
-            )
             data["role"] = RolesEnum.customer.name
             user = UserModel(**data)
 
             db.session.add(user)
             db.session.flush()
 
-            ses_email.send_email(data["email"], subject, content)
+            OutboxManager.enqueue(
+                OutboxKindEnum.email,
+                recipient=data["email"],
+                subject=subject,
+                content=content,
+            )
         except IntegrityError:
             raise Conflict(f"Email '{data["email"]}' already exists")
         except Exception as ex:
@@ -52,10 +60,11 @@ class UserManager:
     @staticmethod
     def create_user(data):
 
+        data["password"] = hash_pool.run(
+            generate_password_hash, data["password"], method="pbkdf2:sha256"
+        )
+
         try:
-            data["password"] = generate_password_hash(
-                data["password"], method="pbkdf2:sha256"
-            )
             user = UserModel(**data)
 
             db.session.add(user)
@@ -72,17 +81,22 @@ class UserManager:
             ).scalar_one()
             db.session.delete(user)
             db.session.flush()
+            principal_cache.invalidate(user_id)
+            AuthManager.revoke_tokens(user_id)
         except NoResultFound:
             raise NotFound(f"User with ID {user_id} not found")
 
     @staticmethod
     def change_password(user: UserModel, data):
 
-        if not check_password_hash(user.password, data["old_password"]):
+        if not hash_pool.run(check_password_hash, user.password, data["old_password"]):
             raise Conflict("Invalid password")
 
-        user.password = generate_password_hash(
-            data["new_password"], method="pbkdf2:sha256"
+        user.password = hash_pool.run(
+            generate_password_hash, data["new_password"], method="pbkdf2:sha256"
         )
+        user.token_version += 1
         db.session.add(user)
         db.session.flush()
+        principal_cache.invalidate(user.id)
+        AuthManager.revoke_tokens(user.id, user.token_version)
@@ -0,0 +1,32 @@
+"""Add keyset pagination indexes to table 'orders'
+
+Revision ID: 5b1e7d2c9a40
+Revises: ef7b57f06b94
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b1e7d2c9a40'
+down_revision = 'ef7b57f06b94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Built concurrently, so writes to orders are not blocked while the
+    # indexes are built. CREATE INDEX CONCURRENTLY can't run in a transaction.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_orders_created_on_id', 'orders', ['created_on', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_orders_status_created_on_id', 'orders', ['status', 'created_on', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_orders_user_id_created_on_id', 'orders', ['user_id', 'created_on', 'id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_orders_user_id_created_on_id', table_name='orders', postgresql_concurrently=True)
+        op.drop_index('ix_orders_status_created_on_id', table_name='orders', postgresql_concurrently=True)
+        op.drop_index('ix_orders_created_on_id', table_name='orders', postgresql_concurrently=True)
@@ -4,4 +4,9 @@ from models.order_item import *
 from models.pizza import *
 from models.pizza_size import *
 from models.unpaid_order import *
-from models.unpaid_order_item import *
\ No newline at end of file
+from models.unpaid_order_item import *
+from models.rating_delta import *
+from models.outbox_message import *
+from models.token_revocation import *
+from models.photo_upload import *
+from models.photo import *
\ No newline at end of file
@@ -19,3 +19,20 @@ class StatusEnum(Enum):
     pending = "pending"
     in_transition = "in transition"
     delivered = "delivered"
+
+
+class OutboxKindEnum(Enum):
+    email = "email"
+    sms = "sms"
+
+
+class OutboxStatusEnum(Enum):
+    pending = "pending"
+    sent = "sent"
+    failed = "failed"
+
+
+class PhotoStatusEnum(Enum):
+    ready = "ready"
+    pending = "pending"
+    failed = "failed"
@@ -9,6 +9,11 @@ from models.enums import StatusEnum
 
 class OrderModel(db.Model):
     __tablename__ = "orders"
+    __table_args__ = (
+        db.Index("ix_orders_created_on_id", "created_on", "id"),
+        db.Index("ix_orders_user_id_created_on_id", "user_id", "created_on", "id"),
+        db.Index("ix_orders_status_created_on_id", "status", "created_on", "id"),
+    )
 
     id: Mapped[int] = mapped_column(db.Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db import db
+from models.enums import OutboxKindEnum, OutboxStatusEnum
+
+
+class OutboxMessageModel(db.Model):
+    __tablename__ = "outbox_messages"
+    __table_args__ = (
+        db.Index("ix_outbox_messages_status_next_attempt_on", "status", "next_attempt_on"),
+    )
+
+    id: Mapped[int] = mapped_column(db.Integer, primary_key=True, autoincrement=True)
+    kind: Mapped[OutboxKindEnum] = mapped_column(db.Enum(OutboxKindEnum), nullable=False)
+    payload: Mapped[dict] = mapped_column(db.JSON, nullable=False)
+    status: Mapped[OutboxStatusEnum] = mapped_column(
+        db.Enum(OutboxStatusEnum), default=OutboxStatusEnum.pending, nullable=False
+    )
+    attempts: Mapped[int] = mapped_column(db.Integer, default=0, nullable=False)
+    last_error: Mapped[str] = mapped_column(db.Text, nullable=True)
+    next_attempt_on: Mapped[datetime] = mapped_column(
+        db.DateTime, server_default=func.now(), nullable=False
+    )
+    created_on: Mapped[datetime] = mapped_column(db.DateTime, server_default=func.now())
+    updated_on: Mapped[datetime] = mapped_column(
+        db.DateTime, server_default=func.now(), onupdate=func.now()
+    )
@@ -0,0 +1,18 @@
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db import db
+
+
+class PhotoModel(db.Model):
+    __tablename__ = "photos"
+
+    id: Mapped[int] = mapped_column(db.Integer, primary_key=True, autoincrement=True)
+    key: Mapped[str] = mapped_column(db.String(255), unique=True, nullable=False)
+    url: Mapped[str] = mapped_column(db.String(255), nullable=False, index=True)
+    content_type: Mapped[str] = mapped_column(db.String(50), nullable=False)
+    variants: Mapped[dict] = mapped_column(db.JSON, nullable=True)
+    orphaned_on: Mapped[datetime] = mapped_column(db.DateTime, nullable=True, index=True)
+    created_on: Mapped[datetime] = mapped_column(db.DateTime, server_default=func.now())
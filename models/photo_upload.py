@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db import db
+
+
+class PhotoUploadModel(db.Model):
+    __tablename__ = "photo_uploads"
+
+    id: Mapped[int] = mapped_column(db.Integer, primary_key=True, autoincrement=True)
+    pizza_id: Mapped[int] = mapped_column(
+        db.ForeignKey("pizzas.id", ondelete="CASCADE"), unique=True, nullable=False
+    )
+    key: Mapped[str] = mapped_column(db.String(255), nullable=False)
+    content_type: Mapped[str] = mapped_column(db.String(50), nullable=False)
+    content: Mapped[bytes] = mapped_column(db.LargeBinary, nullable=False)
+    attempts: Mapped[int] = mapped_column(db.Integer, default=0, nullable=False)
+    last_error: Mapped[str] = mapped_column(db.Text, nullable=True)
+    next_attempt_on: Mapped[datetime] = mapped_column(
+        db.DateTime, server_default=func.now(), nullable=False, index=True
+    )
+    created_on: Mapped[datetime] = mapped_column(db.DateTime, server_default=func.now())
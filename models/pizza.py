@@ -4,6 +4,7 @@ from sqlalchemy import func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from db import db
+from models.enums import PhotoStatusEnum
 
 
 class PizzaModel(db.Model):
@@ -12,7 +13,14 @@ class PizzaModel(db.Model):
     id: Mapped[int] = mapped_column(db.Integer, primary_key=True)
     name: Mapped[str] = mapped_column(db.String(255), unique=True, nullable=False)
     ingredients: Mapped[str] = mapped_column(db.Text, nullable=False)
-    photo_url: Mapped[str] = mapped_column(db.String(255), nullable=False)
+    photo_url: Mapped[str] = mapped_column(db.String(255), nullable=True)
+    photos: Mapped[dict] = mapped_column(db.JSON, nullable=True)
+    photo_status: Mapped[PhotoStatusEnum] = mapped_column(
+        db.Enum(PhotoStatusEnum),
+        default=PhotoStatusEnum.ready,
+        server_default=PhotoStatusEnum.ready.name,
+        nullable=False,
+    )
     created_on: Mapped[datetime] = mapped_column(db.DateTime, server_default=func.now())
     updated_on: Mapped[datetime] = mapped_column(
         db.DateTime, server_default=func.now(), onupdate=func.now()
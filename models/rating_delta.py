@@ -0,0 +1,17 @@
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db import db
+
+
+class RatingDeltaModel(db.Model):
+    __tablename__ = "rating_deltas"
+
+    id: Mapped[int] = mapped_column(db.Integer, primary_key=True, autoincrement=True)
+    pizza_size_id: Mapped[int] = mapped_column(
+        db.ForeignKey("pizza_sizes.id", ondelete="CASCADE"), nullable=False
+    )
+    delta: Mapped[int] = mapped_column(db.Integer, nullable=False)
+    created_on: Mapped[datetime] = mapped_column(db.DateTime, server_default=func.now())
@@ -0,0 +1,14 @@
+from datetime import datetime
+
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db import db
+
+
+class TokenRevocationModel(db.Model):
+    __tablename__ = "token_revocations"
+
+    id: Mapped[int] = mapped_column(db.Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(db.Integer, nullable=False)
+    min_version: Mapped[int] = mapped_column(db.Integer, nullable=False)
+    expires_on: Mapped[datetime] = mapped_column(db.DateTime, nullable=False, index=True)
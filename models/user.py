@@ -19,6 +19,9 @@ class UserModel(db.Model):
     role: Mapped[RolesEnum] = mapped_column(
         db.Enum(RolesEnum), default=RolesEnum.customer, nullable=False
     )
+    token_version: Mapped[int] = mapped_column(
+        db.Integer, default=0, server_default="0", nullable=False
+    )
     created_on: Mapped[datetime] = mapped_column(db.DateTime, server_default=func.now())
     updated_on: Mapped[datetime] = mapped_column(
         db.DateTime, server_default=func.now(), onupdate=func.now()
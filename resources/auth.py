@@ -1,4 +1,3 @@
-from flask import request
 from flask_restful import Resource
 
 from managers.auth import auth
@@ -8,15 +7,22 @@ from schemas.request.user import (
     UserRegisterSchema,
     PasswordChangeSchema,
 )
-from util.decorators import validate_schema
+from util.decorators import rate_limit, validate_schema
+from util.rate_limit import (
+    client_ip,
+    login_email,
+    login_email_limiter,
+    login_ip_limiter,
+)
 
 
 class UserLogin(Resource):
 
+    @rate_limit(login_ip_limiter, client_ip)
+    @rate_limit(login_email_limiter, login_email)
     @validate_schema(UserLoginSchema)
-    def post(self):
+    def post(self, data):
 
-        data = request.get_json()
         token = UserManager.login(data)
         return {"token": token}, 200
 
@@ -24,9 +30,8 @@ class UserLogin(Resource):
 class UserRegister(Resource):
 
     @validate_schema(UserRegisterSchema)
-    def post(self):
+    def post(self, data):
 
-        data = request.get_json()
         token = UserManager.register(data)
         return {"token": token}, 201
 
@@ -35,9 +40,8 @@ class Password(Resource):
 
     @auth.login_required
     @validate_schema(PasswordChangeSchema)
-    def post(self):
+    def post(self, data):
 
-        user = auth.current_user()
-        data = request.get_json()
+        user = auth.current_user().user
         UserManager.change_password(user, data)
         return "", 204
@@ -1,13 +1,16 @@
 from flask import request
 from flask_restful import Resource
+from marshmallow import ValidationError
 from werkzeug.exceptions import BadRequest
 
 from managers.auth import auth
 from managers.order import OrderManager
 from models.enums import RolesEnum, StatusEnum
-from schemas.response.order import OrderResponseSchema
-from schemas.request.order import OrderRequestSchema
+from schemas.response.order import OrderListResponse, OrderResponse, order_response
+from schemas.request.order import OrderListRequestSchema, OrderRequestSchema
 from util.decorators import permission_required, validate_schema
+from util.helper import parse_fields
+from util.response import encode_response, make_etag, not_modified
 
 
 class Orders(Resource):
@@ -15,16 +18,38 @@ class Orders(Resource):
     @auth.login_required
     def get(self):
 
+        try:
+            filters = OrderListRequestSchema().load(request.args)
+        except ValidationError as ex:
+            raise BadRequest(f"Invalid query parameters: {ex.messages}")
+
+        fields = parse_fields(
+            filters.pop("fieldset", None), OrderResponse.__struct_fields__
+        )
         user = auth.current_user()
-        orders = OrderManager.get_orders(user)
-        return {"orders": OrderResponseSchema().dump(orders, many=True)}, 200
+
+        # The orders are only loaded when the client's copy is out of date
+        etag = make_etag(
+            user.id, user.role, OrderManager.get_orders_version(user, filters)
+        )
+        response = not_modified(etag)
+        if response is not None:
+            return response
+
+        orders, next_cursor = OrderManager.get_orders(user, filters, fields)
+        return encode_response(
+            OrderListResponse(
+                orders=[order_response(order, fields) for order in orders],
+                next_cursor=next_cursor,
+            ),
+            etag=etag,
+        )
 
     @auth.login_required
     @permission_required([RolesEnum.customer])
     @validate_schema(OrderRequestSchema)
-    def post(self):
+    def post(self, data):
         user = auth.current_user()
-        data = request.get_json()
         response = OrderManager.create_order(user, data)
         return response, 200
 
@@ -42,8 +67,21 @@ class Order(Resource):
     @permission_required([RolesEnum.deliver, RolesEnum.admin])
     def get(self, order_id):
 
-        order = OrderManager.get_order(order_id)
-        return {"order": OrderResponseSchema().dump(order)}, 200
+        fields = parse_fields(
+            request.args.get("fields"), OrderResponse.__struct_fields__
+        )
+        last_modified, size_count = OrderManager.get_order_version(order_id)
+        etag = make_etag(order_id, last_modified, size_count)
+        response = not_modified(etag, last_modified)
+        if response is not None:
+            return response
+
+        order = OrderManager.get_order(order_id, with_items=True, fields=fields)
+        return encode_response(
+            {"order": order_response(order, fields)},
+            etag=etag,
+            last_modified=last_modified,
+        )
 
     @auth.login_required
     @permission_required([RolesEnum.deliver, RolesEnum.admin])
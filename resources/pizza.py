@@ -3,31 +3,48 @@ from flask_restful import Resource
 
 from managers.auth import auth
 from managers.pizza import PizzaManager
-from models.enums import RolesEnum
-from schemas.response.pizza import PizzaResponseSchema
+from models.enums import PhotoStatusEnum, RolesEnum
+from schemas.response.pizza import PizzaResponse, pizza_response
 from schemas.request.pizza import (
     PizzaRequestSchema,
     PizzaUpdateRequestSchema,
     PizzaSizeRequestSchema,
     PizzaSizeUpdateRequestSchema,
 )
+from util.cache import menu_cache
 from util.decorators import permission_required, validate_schema
+from util.helper import parse_fields, select_fields
+from util.response import Representation, response_mimetype, send_representation
 
 
 class Pizzas(Resource):
 
     def get(self):
 
-        pizzas = PizzaManager.get_pizzas()
-        return PizzaResponseSchema().dump(pizzas, many=True)
+        # Sparse menus are cut from the cached full menu, which is cheaper
+        # than querying only the requested columns
+        fields = parse_fields(
+            request.args.get("fields"), PizzaResponse.__struct_fields__
+        )
+
+        def build():
+            menu = menu_cache.get_menu(
+                lambda: [pizza_response(pizza) for pizza in PizzaManager.get_pizzas()]
+            )
+            return Representation([select_fields(pizza, fields) for pizza in menu])
+
+        return send_representation(
+            menu_cache.get_representation(("menu", response_mimetype(), fields), build)
+        )
 
     @auth.login_required
     @permission_required([RolesEnum.chef, RolesEnum.admin])
     @validate_schema(PizzaRequestSchema)
-    def post(self):
+    def post(self, data):
 
-        data = request.get_json()
-        PizzaManager.create_pizza(data)
+        pizza = PizzaManager.create_pizza(data)
+        if pizza.photo_status == PhotoStatusEnum.pending:
+            return {"message": "Pizza created, photo upload pending"}, 202
         return {"message": "Pizza successfully created"}, 201
 
 
@@ -35,16 +52,31 @@ class Pizza(Resource):
 
     def get(self, pizza_id):
 
-        pizza = PizzaManager.get_pizza(pizza_id)
-        return PizzaResponseSchema().dump(pizza)
+        fields = parse_fields(
+            request.args.get("fields"), PizzaResponse.__struct_fields__
+        )
+
+        def build():
+            pizza = menu_cache.get_pizza(
+                pizza_id, lambda: pizza_response(PizzaManager.get_pizza(pizza_id))
+            )
+            return Representation(select_fields(pizza, fields))
+
+        return send_representation(
+            menu_cache.get_representation(
+                ("pizza", pizza_id, response_mimetype(), fields), build
+            )
+        )
 
     @auth.login_required
     @permission_required([RolesEnum.chef, RolesEnum.admin])
     @validate_schema(PizzaUpdateRequestSchema)
-    def put(self, pizza_id):
+    def put(self, pizza_id, data):
 
-        data = request.get_json()
-        PizzaManager.update_pizza(pizza_id, data)
+        photo_changed = "photo" in data
+        pizza = PizzaManager.update_pizza(pizza_id, data)
+        if photo_changed and pizza.photo_status == PhotoStatusEnum.pending:
+            return {"message": "Pizza updated, photo upload pending"}, 202
         return "", 204
 
     @auth.login_required
@@ -60,9 +92,8 @@ class PizzaSizes(Resource):
     @auth.login_required
     @permission_required([RolesEnum.chef, RolesEnum.admin])
     @validate_schema(PizzaSizeRequestSchema)
-    def post(self):
+    def post(self, data):
 
-        data = request.get_json()
         PizzaManager.add_pizza_size(data)
         return {"message": "Pizza size successfully created"}, 201
 
@@ -72,9 +103,8 @@ class PizzaSize(Resource):
     @auth.login_required
     @permission_required([RolesEnum.chef, RolesEnum.admin])
     @validate_schema(PizzaSizeUpdateRequestSchema)
-    def put(self, pizza_id):
+    def put(self, pizza_id, data):
 
-        data = request.get_json()
         PizzaManager.update_pizza(pizza_id, data, size=True)
         return "", 204
 
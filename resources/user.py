@@ -1,4 +1,3 @@
-from flask import request
 from flask_restful import Resource
 
 from managers.auth import auth
@@ -13,9 +12,8 @@ class Users(Resource):
     @auth.login_required
     @permission_required([RolesEnum.admin])
     @validate_schema(UserCreateRequestSchema)
-    def post(self):
+    def post(self, data):
 
-        data = request.get_json()
         UserManager.create_user(data)
         return {"message": "User created"}, 201
 
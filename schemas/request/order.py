@@ -1,6 +1,9 @@
-from marshmallow import fields, Schema, validates, ValidationError
+from datetime import timezone
 
-from models.enums import SizeEnum
+from marshmallow import fields, Schema, validates, validates_schema, ValidationError
+from marshmallow.validate import Range
+
+from models.enums import SizeEnum, StatusEnum
 
 
 class OrderItemRequestSchema(Schema):
@@ -36,3 +39,23 @@ class OrderRequestSchema(Schema):
                     )
         except KeyError:
             pass
+
+
+class OrderListRequestSchema(Schema):
+    limit = fields.Integer(load_default=20, validate=Range(min=1, max=100))
+    cursor = fields.String()
+    status = fields.Enum(StatusEnum)
+    # created_on is stored as naive UTC, so aware values are converted to it
+    created_from = fields.NaiveDateTime(timezone=timezone.utc)
+    created_to = fields.NaiveDateTime(timezone=timezone.utc)
+    fieldset = fields.String(data_key="fields")
+
+    @validates_schema
+    def validate_date_range(self, data, **kwargs):
+
+        if (
+            "created_from" in data
+            and "created_to" in data
+            and data["created_from"] > data["created_to"]
+        ):
+            raise ValidationError("'created_from' should not be after 'created_to'")
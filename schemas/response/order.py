@@ -1,6 +1,13 @@
+from datetime import datetime
+from decimal import Decimal
+
+import msgspec
+
 from marshmallow import fields, Schema
+from msgspec import UNSET, UnsetType
 
 from models.enums import SizeEnum, StatusEnum
+from util.helper import format_price
 
 
 class OrderItemResponseSchema(Schema):
@@ -16,3 +23,53 @@ class OrderResponseSchema(Schema):
     created_on = fields.DateTime(required=True)
     status = fields.Enum(StatusEnum, required=True)
     items = fields.List(fields.Nested(OrderItemResponseSchema), required=True)
+
+
+class OrderItemResponse(msgspec.Struct):
+    quantity: int
+    name: str
+    size: str
+    price: Decimal
+
+
+class OrderResponse(msgspec.Struct):
+    id: int | UnsetType = UNSET
+    total_price: Decimal | UnsetType = UNSET
+    created_on: datetime | UnsetType = UNSET
+    status: str | UnsetType = UNSET
+    items: list[OrderItemResponse] | UnsetType = UNSET
+
+
+class OrderListResponse(msgspec.Struct):
+    orders: list[OrderResponse]
+    next_cursor: str | None
+
+
+def order_item_response(item):
+
+    return OrderItemResponse(
+        quantity=item.quantity,
+        name=item.pizza_size.pizza.name,
+        size=item.pizza_size.size.name,
+        price=format_price(item.pizza_size.price),
+    )
+
+
+order_fields = {
+    "id": lambda order: order.id,
+    "total_price": lambda order: format_price(order.total_price),
+    "created_on": lambda order: order.created_on,
+    "status": lambda order: order.status.name,
+    "items": lambda order: [order_item_response(item) for item in order.items],
+}
+
+
+def order_response(order, fields=None):
+
+    return OrderResponse(
+        **{
+            name: value(order)
+            for name, value in order_fields.items()
+            if fields is None or name in fields
+        }
+    )
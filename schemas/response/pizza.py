@@ -1,6 +1,13 @@
+from decimal import Decimal
+
+import msgspec
+
 from marshmallow import fields
+from msgspec import UNSET, UnsetType
 
+from models.enums import PhotoStatusEnum
 from schemas.base import PizzaBaseSchema, PizzaSizeBaseSchema
+from util.helper import format_price
 
 
 class PizzaSizeResponseSchema(PizzaSizeBaseSchema):
@@ -11,4 +18,61 @@ class PizzaSizeResponseSchema(PizzaSizeBaseSchema):
 class PizzaResponseSchema(PizzaBaseSchema):
     id = fields.Integer(required=True)
     photo_url = fields.String(required=True)
+    photo_status = fields.Enum(PhotoStatusEnum, required=True)
+    photos = fields.Dict(
+        keys=fields.String(), values=fields.Dict(keys=fields.String(), values=fields.String())
+    )
     sizes = fields.List(fields.Nested(PizzaSizeResponseSchema))
+
+
+class PizzaSizeResponse(msgspec.Struct):
+    size: str
+    grammage: int
+    price: Decimal
+    id: int
+    rating: str
+
+
+class PizzaResponse(msgspec.Struct):
+    name: str | UnsetType = UNSET
+    ingredients: str | UnsetType = UNSET
+    id: int | UnsetType = UNSET
+    photo_url: str | None | UnsetType = UNSET
+    photo_status: str | UnsetType = UNSET
+    photos: dict[str, dict[str, str]] | None | UnsetType = UNSET
+    sizes: list[PizzaSizeResponse] | UnsetType = UNSET
+
+
+def pizza_size_response(size):
+
+    return PizzaSizeResponse(
+        size=size.size.name,
+        grammage=size.grammage,
+        price=format_price(size.price),
+        id=size.id,
+        rating=str(size.rating),
+    )
+
+
+pizza_fields = {
+    "name": lambda pizza: pizza.name,
+    "ingredients": lambda pizza: pizza.ingredients,
+    "id": lambda pizza: pizza.id,
+    "photo_url": lambda pizza: pizza.photo_url,
+    "photo_status": lambda pizza: pizza.photo_status.name,
+    "photos": lambda pizza: pizza.photos,
+    "sizes": lambda pizza: [pizza_size_response(size) for size in pizza.sizes],
+}
+
+
+def pizza_response(pizza, fields=None):
+
+    # Only the requested attributes are read, so unloaded columns and
+    # relationships are never lazy loaded
+    return PizzaResponse(
+        **{
+            name: value(pizza)
+            for name, value in pizza_fields.items()
+            if fields is None or name in fields
+        }
+    )
@@ -0,0 +1,60 @@
+import threading
+
+import boto3
+
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from decouple import config
+
+
+class AWSClients:
+
+    def __init__(self):
+        self.access_key = config("AWS_ACCESS_KEY")
+        self.secret_key = config("AWS_SECRET_KEY")
+        self.region = config("AWS_REGION")
+        self.client_config = Config(
+            max_pool_connections=config("AWS_MAX_POOL_CONNECTIONS", default=50, cast=int),
+            connect_timeout=config("AWS_CONNECT_TIMEOUT", default=5, cast=float),
+            read_timeout=config("AWS_READ_TIMEOUT", default=30, cast=float),
+            retries={
+                "mode": "adaptive",
+                "max_attempts": config("AWS_MAX_ATTEMPTS", default=5, cast=int),
+            },
+        )
+        # Files above the threshold are uploaded in parts, several at a time
+        self.transfer_config = TransferConfig(
+            multipart_threshold=config(
+                "S3_MULTIPART_THRESHOLD", default=8 * 1024 * 1024, cast=int
+            ),
+            multipart_chunksize=config(
+                "S3_MULTIPART_CHUNKSIZE", default=8 * 1024 * 1024, cast=int
+            ),
+            max_concurrency=config("S3_TRANSFER_CONCURRENCY", default=10, cast=int),
+        )
+        self._session = None
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def client(self, service_name):
+
+        # Clients are safe to share between threads, but creating them is not,
+        # so each one is created once under the lock and then reused
+        client = self._clients.get(service_name)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(service_name)
+                if client is None:
+                    if self._session is None:
+                        self._session = boto3.session.Session(
+                            aws_access_key_id=self.access_key,
+                            aws_secret_access_key=self.secret_key,
+                            region_name=self.region,
+                        )
+                    client = self._session.client(service_name, config=self.client_config)
+                    self._clients[service_name] = client
+
+        return client
+
+
+aws_clients = AWSClients()
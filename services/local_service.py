@@ -0,0 +1,54 @@
+import threading
+
+from werkzeug.exceptions import InternalServerError
+
+
+class LocalTransport:
+
+    def __init__(self, failures: int = 0):
+        self.sent = []
+        self.failures = failures
+        self._lock = threading.Lock()
+
+    def __call__(self, payloads: list[dict]):
+
+        errors = []
+        with self._lock:
+            for payload in payloads:
+                if self.failures:
+                    self.failures -= 1
+                    errors.append("Local transport is not available")
+                else:
+                    self.sent.append(payload)
+                    errors.append(None)
+
+        return errors
+
+
+class LocalS3Service:
+
+    def __init__(self, failures: int = 0):
+        self.objects = {}
+        self.failures = failures
+        self._lock = threading.Lock()
+
+    def upload_photo(self, fileobj, key, content_type):
+
+        with self._lock:
+            if self.failures:
+                self.failures -= 1
+                raise InternalServerError("S3 is not available at the moment")
+
+            self.objects[key] = (fileobj.read(), content_type)
+
+        return f"https://local-bucket.s3.local.amazonaws.com/{key}"
+
+    def upload_photos(self, photos: list[tuple]):
+
+        return [self.upload_photo(*photo) for photo in photos]
+
+    def delete_photos(self, keys: list[str]):
+
+        with self._lock:
+            for key in keys:
+                self.objects.pop(key, None)
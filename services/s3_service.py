@@ -1,31 +1,73 @@
-import boto3
+import threading
+
+from concurrent.futures import ThreadPoolExecutor, wait
 
 from botocore.exceptions import ClientError
 from decouple import config
 from werkzeug.exceptions import InternalServerError
 
+from services.aws import aws_clients
+
 
 class S3Service:
 
     def __init__(self):
-        self.access_key = config("AWS_ACCESS_KEY")
-        self.secret_key = config("AWS_SECRET_KEY")
-        self.s3 = boto3.client(
-            "s3",
-            aws_access_key_id=self.access_key,
-            aws_secret_access_key=self.secret_key,
-        )
         self.bucket = config("AWS_BUCKET")
+        self.max_workers = config("S3_MAX_WORKERS", default=8, cast=int)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
 
-    def upload_photo(self, path, key, extension):
+        return self._executor
+
+    @property
+    def s3(self):
+
+        return aws_clients.client("s3")
+
+    def upload_photo(self, fileobj, key, content_type):
 
         try:
-            self.s3.upload_file(
-                path, self.bucket, key, ExtraArgs={"ContentType": f"image/{extension}"}
+            self.s3.upload_fileobj(
+                fileobj,
+                self.bucket,
+                key,
+                ExtraArgs={"ContentType": content_type},
+                Config=aws_clients.transfer_config,
             )
             return f"https://{config("AWS_BUCKET")}.s3.{config("AWS_REGION")}.amazonaws.com/{key}"
         except ClientError as ex:
             raise InternalServerError(f"S3 is not available at the moment {str(ex)}")
 
+    def upload_photos(self, photos: list[tuple]):
+
+        # The photos are uploaded in parallel, and the first failure is raised
+        # once all of them are done
+        futures = [self.executor.submit(self.upload_photo, *photo) for photo in photos]
+        wait(futures)
+
+        return [future.result() for future in futures]
+
+    def delete_photos(self, keys: list[str]):
+
+        try:
+            for start in range(0, len(keys), 1000):
+                self.s3.delete_objects(
+                    Bucket=self.bucket,
+                    Delete={
+                        "Objects": [{"Key": key} for key in keys[start : start + 1000]],
+                        "Quiet": True,
+                    },
+                )
+        except ClientError as ex:
+            raise InternalServerError(f"S3 is not available at the moment {str(ex)}")
+
 
 s3_store = S3Service()
@@ -1,22 +1,35 @@
-import boto3
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
 
 from decouple import config
 from botocore.exceptions import ClientError
 from werkzeug.exceptions import InternalServerError
 
+from services.aws import aws_clients
+
 
 class SESEmail:
 
     def __init__(self):
-        self.access_key = config("AWS_ACCESS_KEY")
-        self.secret_key = config("AWS_SECRET_KEY")
-        self.region = config("AWS_REGION")
-        self.ses = boto3.client(
-            "ses",
-            aws_access_key_id=self.access_key,
-            aws_secret_access_key=self.secret_key,
-            region_name=self.region,
-        )
+        self.max_workers = config("SES_MAX_WORKERS", default=8, cast=int)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def ses(self):
+
+        return aws_clients.client("ses")
+
+    @property
+    def executor(self):
+
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+
+        return self._executor
 
     def send_email(self, recipient, subject, content):
 
@@ -33,5 +46,17 @@ class SESEmail:
         except ClientError as ex:
             raise InternalServerError(f"Failed to send email: {ex}")
 
+    def send_emails(self, emails: list[tuple[str, str, str]]):
+
+        def send(email):
+            recipient, subject, content = email
+            try:
+                self.send_email(recipient, subject, content)
+                return {"recipient": recipient, "error": None}
+            except Exception as ex:
+                return {"recipient": recipient, "error": str(ex)}
+
+        return list(self.executor.map(send, emails))
+
 
 ses_email = SESEmail()
@@ -1,4 +1,10 @@
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
 from decouple import config
+from requests.adapters import HTTPAdapter
+from twilio.http.http_client import TwilioHttpClient
 from twilio.rest import Client
 
 
@@ -8,13 +14,59 @@ class TwilioSMS:
         self.account_sid = config("TWILIO_SID")
         self.auth_token = config("TWILIO_TOKEN")
         self.twilio_number = config("TWILIO_NUMBER")
+        self.max_workers = config("TWILIO_MAX_WORKERS", default=8, cast=int)
+        self.timeout = config("TWILIO_TIMEOUT", default=10, cast=float)
+        self._client = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+
+        # The client and its keep-alive session are created once and shared by
+        # all threads, instead of opening a new HTTPS connection for every SMS
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    http_client = TwilioHttpClient(timeout=self.timeout)
+                    http_client.session.mount(
+                        "https://", HTTPAdapter(pool_maxsize=self.max_workers)
+                    )
+                    self._client = Client(
+                        self.account_sid, self.auth_token, http_client=http_client
+                    )
+
+        return self._client
+
+    @property
+    def executor(self):
+
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+
+        return self._executor
 
     def send_notification(self, recipient_number: str, message: str):
-        client = Client(self.account_sid, self.auth_token)
 
-        message = client.messages.create(
+        message = self.client.messages.create(
             body=message, from_=self.twilio_number, to=recipient_number
         )
 
+        return message.sid
+
+    def send_notifications(self, notifications: list[tuple[str, str]]):
+
+        def send(notification):
+            recipient_number, message = notification
+            try:
+                sid = self.send_notification(recipient_number, message)
+                return {"recipient": recipient_number, "sid": sid, "error": None}
+            except Exception as ex:
+                return {"recipient": recipient_number, "sid": None, "error": str(ex)}
+
+        return list(self.executor.map(send, notifications))
+
 
 twilio_notify = TwilioSMS()
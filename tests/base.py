@@ -1,9 +1,14 @@
+from contextlib import contextmanager
+
 from decouple import config
 from flask_testing import TestCase
+from sqlalchemy import event
 
 from config import create_app
 from db import db
 from managers.auth import AuthManager
+from util.cache import menu_cache, principal_cache, revocation_list
+from util.rate_limit import rate_limit_store
 
 
 def generate_token(user):
@@ -11,6 +16,21 @@ def generate_token(user):
     return AuthManager.encode_token(user)
 
 
+@contextmanager
+def count_queries():
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+
 class BaseTestCase(TestCase):
 
     def create_app(self):
@@ -21,6 +41,10 @@ class BaseTestCase(TestCase):
     def setUp(self):
 
         db.create_all()
+        menu_cache.bump()
+        principal_cache.clear()
+        revocation_list.clear()
+        rate_limit_store.clear()
 
     def tearDown(self):
 
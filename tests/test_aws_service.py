@@ -0,0 +1,28 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from unittest.mock import MagicMock, patch
+
+from services.aws import AWSClients
+from tests.base import BaseTestCase
+
+
+class TestAWSClients(BaseTestCase):
+
+    @patch("services.aws.boto3.session.Session")
+    def test_client_created_once(self, session_mock):
+
+        session_mock.return_value.client.side_effect = lambda name, config: MagicMock()
+        clients = AWSClients()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            s3_clients = list(executor.map(lambda _: clients.client("s3"), range(32)))
+        ses_client = clients.client("ses")
+
+        session_mock.assert_called_once()
+        self.assertEqual(session_mock.return_value.client.call_count, 2)
+        self.assertEqual(len({id(client) for client in s3_clients}), 1)
+        self.assertIsNot(ses_client, s3_clients[0])
+
+        config = session_mock.return_value.client.call_args.kwargs["config"]
+        self.assertEqual(config.retries["mode"], "adaptive")
+        self.assertEqual(config.max_pool_connections, 50)
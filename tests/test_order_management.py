@@ -1,14 +1,20 @@
+from datetime import datetime
+
 from decouple import config
 from unittest.mock import MagicMock, patch
 
 from db import db
-from models.enums import RolesEnum, SizeEnum, StatusEnum
+from managers.rating import RatingFlusher, RatingManager
+from models.enums import OutboxKindEnum, RolesEnum, SizeEnum, StatusEnum
 from models.order import OrderModel
 from models.order_item import OrderItemModel
+from models.outbox_message import OutboxMessageModel
+from models.pizza_size import PizzaSizeModel
+from models.rating_delta import RatingDeltaModel
 from models.unpaid_order import UnpaidOrderModel
 from models.unpaid_order_item import UnpaidOrderItemModel
 from models.user import UserModel
-from tests.base import BaseTestCase, generate_token
+from tests.base import BaseTestCase, count_queries, generate_token
 from tests.factories import (
     OrderFactory,
     OrderItemFactory,
@@ -70,6 +76,82 @@ class TestOrderManagement(BaseTestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(expected_message, message)
 
+    @patch("managers.order.PayPalPayment")
+    def test_create_order_batched_product_lookup(self, paypal_mock):
+
+        payment = MagicMock()
+        payment.create.return_value = True
+        payment_data = {"links": [{}, {"href": "URL"}]}
+        payment.__getitem__.side_effect = payment_data.__getitem__
+        paypal_mock.create_payment.return_value = payment
+
+        customer = UserFactory(role=RolesEnum.customer)
+        token = generate_token(customer)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        products = []
+        for i in range(1, 5):
+            PizzaFactory(id=i, name=f"Pizza {i}")
+            PizzaSizeFactory(id=i * 2, pizza_id=i)
+            PizzaSizeFactory(id=i * 2 + 1, pizza_id=i, size=SizeEnum.s, price=5)
+            products += [
+                {"name": f"Pizza {i}", "size": "m", "quantity": 1},
+                {"name": f"Pizza {i}", "size": "s", "quantity": 2},
+            ]
+
+        # Authenticate once, so that both requests find the user in the cache
+        self.client.get("/orders", headers=headers)
+
+        with count_queries() as statements:
+            response = self.client.post(
+                "/orders", json={"products": products[:2]}, headers=headers
+            )
+        two_products_queries = len(statements)
+
+        with count_queries() as statements:
+            response = self.client.post(
+                "/orders", json={"products": products}, headers=headers
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(statements), two_products_queries)
+        unpaid_order = db.session.execute(
+            db.select(UnpaidOrderModel).order_by(UnpaidOrderModel.id.desc())
+        ).scalars().first()
+        self.assertEqual(float(unpaid_order.total_price), 4 * (7.50 + 2 * 5))
+
+    @patch("managers.order.PayPalPayment")
+    def test_create_order_payment_outside_transaction(self, paypal_mock):
+
+        in_transaction = []
+
+        def create_payment(total_price, unpaid_order_id):
+            in_transaction.append(db.session().in_transaction())
+            raise ConnectionError("PayPal is not available")
+
+        paypal_mock.create_payment.side_effect = create_payment
+
+        data = {"products": [{"name": "Margherita", "size": "m", "quantity": 2}]}
+
+        customer = UserFactory(role=RolesEnum.customer)
+        token = generate_token(customer)
+        headers = {"Authorization": f"Bearer {token}"}
+        pizza = PizzaFactory(id=1)
+        pizza_size_m = PizzaSizeFactory(id=1, pizza_id=1)
+
+        with self.assertRaises(ConnectionError):
+            self.client.post("/orders", json=data, headers=headers)
+
+        self.assertEqual(in_transaction, [False])
+        unpaid_orders = (
+            db.session.execute(db.select(UnpaidOrderModel)).scalars().fetchall()
+        )
+        self.assertEqual(len(unpaid_orders), 0)
+        unpaid_order_items = (
+            db.session.execute(db.select(UnpaidOrderItemModel)).scalars().fetchall()
+        )
+        self.assertEqual(len(unpaid_order_items), 0)
+
     def test_create_order_pizza_not_found(self):
 
         data = {
@@ -201,10 +283,40 @@ class TestOrderManagement(BaseTestCase):
         self.assertEqual(len(orders), 1)
         order_items = db.session.execute(db.select(OrderItemModel)).scalars().fetchall()
         self.assertEqual(len(order_items), 1)
+        pizza_size = db.session.execute(db.select(PizzaSizeModel)).scalar_one()
+        self.assertEqual(pizza_size.rating, 1)
 
         self.assertEqual(response.status_code, 201)
         self.assertEqual(expected_message, message)
 
+    @patch("managers.order.PayPalPayment")
+    def test_capture_payment_ratings_incremented(self, paypal_mock):
+
+        payment = MagicMock()
+        payment.execute.return_value = True
+        paypal_mock.find_payment.return_value = payment
+
+        user = UserFactory(id=1)
+        pizza = PizzaFactory(id=1)
+        pizza_size_m = PizzaSizeFactory(id=1, pizza_id=1, rating=5)
+        pizza_size_s = PizzaSizeFactory(id=2, pizza_id=1, size=SizeEnum.s)
+        pizza_size_l = PizzaSizeFactory(id=3, pizza_id=1, size=SizeEnum.l, rating=2)
+        unpaid_order = UnpaidOrderFactory(id=1, user_id=1, total_price=30)
+        UnpaidOrderItemFactory(unpaid_order_id=1, pizza_size_id=1, quantity=3)
+        UnpaidOrderItemFactory(unpaid_order_id=1, pizza_size_id=2, quantity=1)
+
+        response = self.client.get(
+            "/payment/execute?unpaid_order_id=1&paymentId=1&PayerID=1"
+        )
+
+        ratings = dict(
+            db.session.execute(
+                db.select(PizzaSizeModel.id, PizzaSizeModel.rating)
+            ).fetchall()
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(ratings, {1: 8, 2: 1, 3: 2})
+
     @patch("managers.order.PayPalPayment")
     def test_capture_payment_fail(self, paypal_mock):
 
@@ -309,6 +421,252 @@ class TestOrderManagement(BaseTestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.json["orders"]), 3)
 
+    def test_get_orders_pagination(self):
+
+        deliver = UserFactory(role=RolesEnum.deliver)
+        token = generate_token(deliver)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        user = UserFactory(id=1)
+        order_1 = OrderFactory(id=1, user_id=1)
+        order_2 = OrderFactory(id=2, user_id=1)
+        order_3 = OrderFactory(id=3, user_id=1)
+
+        response = self.client.get("/orders?limit=2", headers=headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([o["id"] for o in response.json["orders"]], [3, 2])
+        self.assertIsNotNone(response.json["next_cursor"])
+
+        response = self.client.get(
+            f"/orders?limit=2&cursor={response.json["next_cursor"]}", headers=headers
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([o["id"] for o in response.json["orders"]], [1])
+        self.assertIsNone(response.json["next_cursor"])
+
+    def test_get_orders_sparse_fields(self):
+
+        deliver = UserFactory(role=RolesEnum.deliver)
+        headers = {"Authorization": f"Bearer {generate_token(deliver)}"}
+
+        user = UserFactory(id=1)
+        pizza = PizzaFactory(id=1)
+        pizza_size = PizzaSizeFactory(id=1, pizza_id=1)
+        OrderFactory(id=1, user_id=1)
+        OrderItemFactory(order_id=1, pizza_size_id=1)
+        db.session.expire_all()
+        self.client.get("/orders", headers=headers)
+
+        with count_queries() as statements:
+            response = self.client.get("/orders?fields=id,status", headers=headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["orders"], [{"id": 1, "status": "pending"}])
+        self.assertFalse(any("order_items" in statement for statement in statements))
+        self.assertNotIn("total_price", statements[-1])
+
+        response = self.client.get("/order/1?fields=items", headers=headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.json["order"]), ["items"])
+
+    def test_get_orders_not_modified(self):
+
+        deliver = UserFactory(role=RolesEnum.deliver)
+        headers = {"Authorization": f"Bearer {generate_token(deliver)}"}
+
+        user = UserFactory(id=1)
+        OrderFactory(id=1, user_id=1)
+        OrderFactory(id=2, user_id=1)
+
+        response = self.client.get("/orders", headers=headers)
+        etag = response.headers["ETag"]
+
+        with count_queries() as statements:
+            response = self.client.get(
+                "/orders", headers={**headers, "If-None-Match": etag}
+            )
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+        self.assertEqual(len(statements), 1)
+
+        response = self.client.get(
+            "/orders",
+            headers={**headers, "If-None-Match": etag, "Accept": "application/msgpack"},
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.client.put("/order/2/delivered", headers=headers)
+        response = self.client.get(
+            "/orders", headers={**headers, "If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers["ETag"]
+
+        self.client.delete("/orders", headers=headers)
+        response = self.client.get(
+            "/orders", headers={**headers, "If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json["orders"]), 1)
+
+    def test_get_orders_not_modified_outside_page(self):
+
+        deliver = UserFactory(role=RolesEnum.deliver)
+        headers = {"Authorization": f"Bearer {generate_token(deliver)}"}
+
+        user = UserFactory(id=1)
+        for order_id in (1, 2, 3):
+            OrderFactory(id=order_id, user_id=1)
+
+        response = self.client.get("/orders?limit=1", headers=headers)
+        etag = response.headers["ETag"]
+
+        self.client.put("/order/1/delivered", headers=headers)
+        response = self.client.get(
+            "/orders?limit=1", headers={**headers, "If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, 304)
+
+        self.client.put("/order/2/delivered", headers=headers)
+        response = self.client.get(
+            "/orders?limit=1", headers={**headers, "If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_get_order_not_modified_since(self):
+
+        deliver = UserFactory(role=RolesEnum.deliver)
+        headers = {"Authorization": f"Bearer {generate_token(deliver)}"}
+
+        user = UserFactory(id=1)
+        OrderFactory(id=1, user_id=1)
+
+        response = self.client.get("/order/1", headers=headers)
+        last_modified = response.headers["Last-Modified"]
+
+        response = self.client.get(
+            "/order/1", headers={**headers, "If-Modified-Since": last_modified}
+        )
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(
+            "/order/1", headers={**headers, "If-None-Match": "\"other\""}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_get_orders_invalid_fields(self):
+
+        deliver = UserFactory(role=RolesEnum.deliver)
+        headers = {"Authorization": f"Bearer {generate_token(deliver)}"}
+
+        response = self.client.get("/orders?fields=id,password", headers=headers)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json["message"], "Invalid fields: password")
+
+    def test_get_orders_status_filter(self):
+
+        deliver = UserFactory(role=RolesEnum.deliver)
+        token = generate_token(deliver)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        user = UserFactory(id=1)
+        order_1 = OrderFactory(id=1, user_id=1, status=StatusEnum.delivered)
+        order_2 = OrderFactory(id=2, user_id=1, status=StatusEnum.pending)
+        order_3 = OrderFactory(id=3, user_id=1, status=StatusEnum.delivered)
+
+        response = self.client.get("/orders?status=delivered", headers=headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([o["id"] for o in response.json["orders"]], [3, 1])
+
+    def test_get_orders_mixed_timezone_date_range(self):
+
+        deliver = UserFactory(role=RolesEnum.deliver)
+        headers = {"Authorization": f"Bearer {generate_token(deliver)}"}
+
+        user = UserFactory(id=1)
+        OrderFactory(id=1, user_id=1, created_on=datetime(2024, 1, 1, 9, 30))
+        OrderFactory(id=2, user_id=1, created_on=datetime(2024, 1, 1, 10, 30))
+        OrderFactory(id=3, user_id=1, created_on=datetime(2024, 1, 1, 11, 30))
+
+        response = self.client.get(
+            "/orders?created_from=2024-01-01T12:00:00%2B02:00"
+            "&created_to=2024-01-01T11:00:00",
+            headers=headers,
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([o["id"] for o in response.json["orders"]], [2])
+
+        response = self.client.get(
+            "/orders?created_from=2024-01-01T10:00:00Z"
+            "&created_to=2024-01-01T09:00:00",
+            headers=headers,
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(
+            "'created_from' should not be after 'created_to'",
+            response.json["message"],
+        )
+
+    def test_get_orders_invalid_query_parameters(self):
+
+        deliver = UserFactory(role=RolesEnum.deliver)
+        token = generate_token(deliver)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        expected_message = "Invalid query parameters: {'limit': ['Must be greater than or equal to 1 and less than or equal to 100.']}"
+        response = self.client.get("/orders?limit=0", headers=headers)
+        message = response.json["message"]
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(expected_message, message)
+
+        response = self.client.get("/orders?cursor=invalid", headers=headers)
+        message = response.json["message"]
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual("Invalid cursor", message)
+
+    def test_get_orders_constant_number_of_queries(self):
+
+        deliver = UserFactory(role=RolesEnum.deliver)
+        token = generate_token(deliver)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        user = UserFactory(id=1)
+        pizza = PizzaFactory(id=1)
+        pizza_size_m = PizzaSizeFactory(id=1, pizza_id=1)
+        pizza_size_s = PizzaSizeFactory(id=2, pizza_id=1, size=SizeEnum.s)
+        order = OrderFactory(id=1, user_id=1)
+        OrderItemFactory(order_id=1, pizza_size_id=1)
+
+        # Authenticate once, so that both requests find the user in the cache
+        self.client.get("/orders", headers=headers)
+
+        with count_queries() as statements:
+            response = self.client.get("/orders", headers=headers)
+        single_order_queries = len(statements)
+
+        for i in range(2, 5):
+            OrderFactory(id=i, user_id=1)
+            OrderItemFactory(order_id=i, pizza_size_id=1)
+            OrderItemFactory(order_id=i, pizza_size_id=2)
+
+        with count_queries() as statements:
+            response = self.client.get("/orders", headers=headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json["orders"]), 4)
+        self.assertEqual(response.json["orders"][0]["items"][0]["name"], "Margherita")
+        self.assertEqual(len(statements), single_order_queries)
+
     def test_get_order(self):
 
         deliver = UserFactory(role=RolesEnum.deliver)
@@ -472,8 +830,7 @@ class TestOrderManagement(BaseTestCase):
         self.assertEqual(response.status_code, 404)
         self.assertEqual(expected_message, message)
 
-    @patch("managers.order.twilio_notify")
-    def test_update_order_status_in_transition(self, twilio_mock):
+    def test_update_order_status_in_transition(self):
 
         deliver = UserFactory(role=RolesEnum.deliver)
         token = generate_token(deliver)
@@ -492,8 +849,11 @@ class TestOrderManagement(BaseTestCase):
 
         self.assertEqual(response.status_code, 200)
         self.assertEqual(expected_message, message)
-        twilio_mock.send_notification.assert_called_once_with(
-            config("TWILIO_VERIFIED_NUMBER"), sms_message
+        message = db.session.execute(db.select(OutboxMessageModel)).scalar_one()
+        self.assertEqual(message.kind, OutboxKindEnum.sms)
+        self.assertEqual(
+            message.payload,
+            {"recipient": config("TWILIO_VERIFIED_NUMBER"), "message": sms_message},
         )
 
     def test_update_order_status_in_transition_invalid_id(self):
@@ -540,3 +900,80 @@ class TestOrderManagement(BaseTestCase):
 
         self.assertEqual(response.status_code, 404)
         self.assertEqual(expected_message, message)
+
+
+@patch.object(RatingManager, "flush_interval", 3600)
+@patch.object(RatingManager, "write_behind", True)
+class TestRatingWriteBehind(BaseTestCase):
+
+    def tearDown(self):
+
+        flusher = self.app.extensions.pop("rating_flusher", None)
+        if flusher is not None:
+            flusher.stop()
+        super().tearDown()
+
+    def create_order_items(self):
+
+        user = UserFactory(id=1)
+        pizza = PizzaFactory(id=1)
+        pizza_size_m = PizzaSizeFactory(id=1, pizza_id=1, rating=5)
+        pizza_size_s = PizzaSizeFactory(id=2, pizza_id=1, size=SizeEnum.s)
+        unpaid_order = UnpaidOrderFactory(id=1, user_id=1, total_price=30)
+        UnpaidOrderItemFactory(unpaid_order_id=1, pizza_size_id=1, quantity=3)
+        UnpaidOrderItemFactory(unpaid_order_id=1, pizza_size_id=2, quantity=1)
+
+    def get_ratings(self):
+
+        return dict(
+            db.session.execute(
+                db.select(PizzaSizeModel.id, PizzaSizeModel.rating)
+            ).fetchall()
+        )
+
+    @patch("managers.order.PayPalPayment")
+    def test_capture_payment_buffers_ratings(self, paypal_mock):
+
+        self.create_order_items()
+
+        response = self.client.get(
+            "/payment/execute?unpaid_order_id=1&paymentId=1&PayerID=1"
+        )
+        db.session.commit()
+
+        deltas = db.session.execute(db.select(RatingDeltaModel)).scalars().fetchall()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(deltas), 2)
+        self.assertEqual(self.get_ratings(), {1: 5, 2: 0})
+
+        self.assertEqual(RatingManager.flush_ratings(), 2)
+
+        deltas = db.session.execute(db.select(RatingDeltaModel)).scalars().fetchall()
+        self.assertEqual(len(deltas), 0)
+        self.assertEqual(self.get_ratings(), {1: 8, 2: 1})
+
+    @patch("managers.order.PayPalPayment")
+    def test_rating_flusher_flushes_on_stop(self, paypal_mock):
+
+        self.create_order_items()
+        self.client.get("/payment/execute?unpaid_order_id=1&paymentId=1&PayerID=1")
+        db.session.commit()
+
+        flusher = RatingFlusher(self.app, interval=3600)
+        flusher.start()
+        flusher.stop()
+
+        self.assertEqual(self.get_ratings(), {1: 8, 2: 1})
+
+    @patch("managers.order.PayPalPayment")
+    def test_rating_flusher_started_by_first_rating(self, paypal_mock):
+
+        self.assertNotIn("rating_flusher", self.app.extensions)
+
+        self.create_order_items()
+        self.client.get("/payment/execute?unpaid_order_id=1&paymentId=1&PayerID=1")
+        flusher = self.app.extensions["rating_flusher"]
+        RatingManager.add_ratings({1: 1})
+
+        self.assertTrue(flusher.is_alive())
+        self.assertIs(self.app.extensions["rating_flusher"], flusher)
@@ -0,0 +1,136 @@
+from unittest.mock import patch
+
+from db import db
+from managers.outbox import OutboxManager
+from models.enums import OutboxKindEnum, OutboxStatusEnum
+from models.outbox_message import OutboxMessageModel
+from services.local_service import LocalTransport
+from tests.base import BaseTestCase
+
+
+class TestOutboxManagement(BaseTestCase):
+
+    def enqueue_messages(self, count):
+
+        for i in range(count):
+            OutboxManager.enqueue(
+                OutboxKindEnum.sms, recipient="+0748592125", message=f"Message {i}"
+            )
+        db.session.commit()
+
+    def get_messages(self):
+
+        return (
+            db.session.execute(
+                db.select(OutboxMessageModel).order_by(OutboxMessageModel.id)
+            )
+            .scalars()
+            .fetchall()
+        )
+
+    def test_process_messages(self):
+
+        self.enqueue_messages(3)
+        transport = LocalTransport()
+
+        processed = OutboxManager.process_messages({OutboxKindEnum.sms: transport})
+
+        self.assertEqual(processed, 3)
+        self.assertEqual(
+            sorted(payload["message"] for payload in transport.sent),
+            ["Message 0", "Message 1", "Message 2"],
+        )
+        for message in self.get_messages():
+            self.assertEqual(message.status, OutboxStatusEnum.sent)
+            self.assertEqual(message.attempts, 1)
+
+        processed = OutboxManager.process_messages({OutboxKindEnum.sms: transport})
+        self.assertEqual(processed, 0)
+
+    def test_process_messages_retry_with_backoff(self):
+
+        self.enqueue_messages(1)
+        transport = LocalTransport(failures=1)
+
+        processed = OutboxManager.process_messages({OutboxKindEnum.sms: transport})
+
+        message = self.get_messages()[0]
+        self.assertEqual(processed, 1)
+        self.assertEqual(transport.sent, [])
+        self.assertEqual(message.status, OutboxStatusEnum.pending)
+        self.assertEqual(message.attempts, 1)
+        self.assertEqual(message.last_error, "Local transport is not available")
+
+        # The message is not retried before its backoff delay is over
+        processed = OutboxManager.process_messages({OutboxKindEnum.sms: transport})
+        self.assertEqual(processed, 0)
+
+        db.session.execute(
+            db.update(OutboxMessageModel).values(
+                next_attempt_on=message.created_on
+            )
+        )
+        db.session.commit()
+        processed = OutboxManager.process_messages({OutboxKindEnum.sms: transport})
+
+        message = self.get_messages()[0]
+        self.assertEqual(processed, 1)
+        self.assertEqual(len(transport.sent), 1)
+        self.assertEqual(message.status, OutboxStatusEnum.sent)
+        self.assertEqual(message.attempts, 2)
+
+    @patch.object(OutboxManager, "max_attempts", 1)
+    def test_process_messages_max_attempts(self):
+
+        self.enqueue_messages(1)
+        transport = LocalTransport(failures=1)
+
+        OutboxManager.process_messages({OutboxKindEnum.sms: transport})
+
+        message = self.get_messages()[0]
+        self.assertEqual(message.status, OutboxStatusEnum.failed)
+        self.assertEqual(message.attempts, 1)
+
+    def test_purge_sent_messages(self):
+
+        transport = LocalTransport(failures=1)
+        self.enqueue_messages(3)
+        OutboxManager.process_messages({OutboxKindEnum.sms: transport})
+
+        self.assertEqual(OutboxManager.purge_messages(), 0)
+
+        with patch.object(OutboxManager, "retention", 0):
+            self.assertEqual(OutboxManager.purge_messages(), 2)
+
+        message = self.get_messages()[0]
+        self.assertEqual(len(self.get_messages()), 1)
+        self.assertEqual(message.status, OutboxStatusEnum.pending)
+
+    @patch("managers.outbox.twilio_notify")
+    def test_process_sms_messages(self, twilio_mock):
+
+        twilio_mock.send_notifications.return_value = [
+            {"recipient": "+0748592125", "sid": "SM1", "error": None},
+            {"recipient": "+0748592125", "sid": None, "error": "Invalid number"},
+        ]
+        for i in range(2):
+            OutboxManager.enqueue(
+                OutboxKindEnum.sms, recipient="+0748592125", message=f"Message {i}"
+            )
+        db.session.commit()
+
+        OutboxManager.process_messages()
+
+        messages = (
+            db.session.execute(
+                db.select(OutboxMessageModel).order_by(OutboxMessageModel.id)
+            )
+            .scalars()
+            .fetchall()
+        )
+        twilio_mock.send_notifications.assert_called_once_with(
+            [("+0748592125", "Message 0"), ("+0748592125", "Message 1")]
+        )
+        self.assertEqual(messages[0].status, OutboxStatusEnum.sent)
+        self.assertEqual(messages[1].status, OutboxStatusEnum.pending)
+        self.assertEqual(messages[1].last_error, "Invalid number")
@@ -1,37 +1,60 @@
+import base64
+import hashlib
+import io
 import os
+import subprocess
+import sys
 
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
 
-from constants import TEMP_FILE_FOLDER
+from PIL import Image
+from sqlalchemy import func
+from werkzeug.exceptions import BadRequest
+
+from constants import ROOT_DIR
 from db import db
-from models.enums import RolesEnum, SizeEnum
+from managers.photo import PhotoManager
+from models.enums import PhotoStatusEnum, RolesEnum, SizeEnum
+from models.photo import PhotoModel
+from models.photo_upload import PhotoUploadModel
 from models.pizza import PizzaModel
 from models.pizza_size import PizzaSizeModel
-from tests.base import BaseTestCase, generate_token
+from services.local_service import LocalS3Service
+from tests.base import BaseTestCase, count_queries, generate_token
 from tests.factories import PizzaFactory, PizzaSizeFactory, UserFactory
+from util.cache import menu_cache
+from util.executor import BoundedProcessPool
+from util.photo import PhotoStream, render_variants
+
+
+def png_photo(color, size=(640, 480)):
+
+    output = io.BytesIO()
+    Image.new("RGB", size, color).save(output, "PNG")
+    return output.getvalue()
+
+
+PNG_PHOTO = png_photo("red")
+OTHER_PHOTO = png_photo("green")
+PNG_KEY = f"{hashlib.sha256(PNG_PHOTO).hexdigest()}.png"
 
 
 class TestPizzaManagement(BaseTestCase):
 
-    @patch("managers.pizza.os.remove")
-    @patch("managers.pizza.datetime")
-    @patch("managers.pizza.uuid4")
-    @patch("managers.pizza.decode_photo")
-    @patch("managers.pizza.s3_store")
-    def test_create_pizza(self, s3_mock, decode_mock, uuid_mock, dt_mock, os_mock):
-        s3_mock.upload_photo.return_value = "URL"
-        uuid_mock.return_value = "123-456"
-        dt_obj = MagicMock()
-        dt_obj.timestamp.return_value = "1730"
-        dt_mock.now.return_value = dt_obj
+    @patch("managers.photo.s3_store")
+    def test_create_pizza(self, s3_mock):
+        uploads = []
+        s3_mock.upload_photos.side_effect = lambda photos: [
+            uploads.append((photo.read(), key, content_type)) or f"URL/{key}"
+            for photo, key, content_type in photos
+        ]
 
         data = {
             "name": "Margherita",
             "ingredients": "cheese, tomatoe, onion, sausage",
-            "photo": "test",
+            "photo": base64.b64encode(PNG_PHOTO).decode("utf-8"),
             "photo_extension": "png",
         }
-        path = os.path.join(TEMP_FILE_FOLDER, f"123-456_1730.{data["photo_extension"]}")
 
         chef = UserFactory(role=RolesEnum.chef)
         token = generate_token(chef)
@@ -43,10 +66,55 @@ class TestPizzaManagement(BaseTestCase):
         self.assertEqual(len(pizzas), 1)
 
         self.assertEqual(response.status_code, 201)
-        self.assertEqual(pizzas[0].photo_url, "URL")
-        s3_mock.upload_photo.assert_called_once()
-        decode_mock.assert_called_once_with(path, data["photo"])
-        os_mock.assert_called_once_with(path)
+        self.assertEqual(pizzas[0].photo_url, f"URL/{PNG_KEY}")
+        self.assertEqual(uploads[0], (PNG_PHOTO, PNG_KEY, "image/png"))
+
+        stem = PNG_KEY.removesuffix(".png")
+        self.assertEqual(
+            pizzas[0].photos,
+            {
+                variant: {
+                    "webp": f"URL/{stem}/{variant}.webp",
+                    "jpg": f"URL/{stem}/{variant}.jpg",
+                }
+                for variant in ("thumbnail", "card", "full")
+            },
+        )
+        response = self.client.get(f"/pizza/{pizzas[0].id}")
+        self.assertEqual(response.json["photos"], pizzas[0].photos)
+        self.assertEqual(
+            {content_type for _, _, content_type in uploads[1:]},
+            {"image/webp", "image/jpeg"},
+        )
+
+    @patch("managers.photo.s3_store")
+    def test_create_pizza_invalid_photo(self, s3_mock):
+
+        data = {
+            "name": "Margherita",
+            "ingredients": "cheese, tomatoe, onion, sausage",
+            "photo_extension": "png",
+        }
+
+        chef = UserFactory(role=RolesEnum.chef)
+        token = generate_token(chef)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        for photo, expected_message in (
+            ("test", "Unsupported photo format"),
+            ("te$t", "Invalid photo encoding"),
+            (base64.b64encode(b"\xff\xd8\xff").decode(), "Photo is not a valid png image"),
+        ):
+            response = self.client.post(
+                "/pizzas", json={**data, "photo": photo}, headers=headers
+            )
+
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json["message"], expected_message)
+
+        pizzas = db.session.execute(db.select(PizzaModel)).scalars().fetchall()
+        self.assertEqual(len(pizzas), 0)
+        s3_mock.upload_photos.assert_not_called()
 
     def test_pizza_with_conflicting_name(self):
 
@@ -83,6 +151,27 @@ class TestPizzaManagement(BaseTestCase):
 
         self.assertEqual(response.status_code, 200)
 
+    def test_pizzas_get_constant_number_of_queries(self):
+
+        pizza = PizzaFactory(id=1)
+        PizzaSizeFactory(id=1, pizza_id=1)
+
+        with count_queries() as statements:
+            response = self.client.get("/pizzas")
+        single_pizza_queries = len(statements)
+
+        menu_cache.bump()
+        for i in range(2, 6):
+            PizzaFactory(id=i, name=f"Pizza {i}")
+            PizzaSizeFactory(id=i, pizza_id=i)
+
+        with count_queries() as statements:
+            response = self.client.get("/pizzas")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json), 5)
+        self.assertEqual(len(statements), single_pizza_queries)
+
     def test_pizza_update(self):
 
         data = {
@@ -200,6 +289,372 @@ class TestPizzaManagement(BaseTestCase):
         self.assertEqual(expected_message, message)
 
 
+@patch.object(PhotoManager, "async_upload", True)
+class TestAsyncPhotoUpload(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.data = {
+            "name": "Margherita",
+            "ingredients": "cheese, tomatoe, onion, sausage",
+            "photo": base64.b64encode(PNG_PHOTO).decode("utf-8"),
+            "photo_extension": "png",
+        }
+        chef = UserFactory(role=RolesEnum.chef)
+        self.headers = {"Authorization": f"Bearer {generate_token(chef)}"}
+
+    @patch("managers.photo.s3_store", new_callable=LocalS3Service)
+    def test_create_pizza_photo_uploaded_by_worker(self, s3_mock):
+
+        response = self.client.post("/pizzas", json=self.data, headers=self.headers)
+        db.session.commit()
+
+        pizza = db.session.execute(db.select(PizzaModel)).scalar_one()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(pizza.photo_status, PhotoStatusEnum.pending)
+        self.assertIsNone(pizza.photo_url)
+        self.assertEqual(s3_mock.objects, {})
+
+        response = self.client.get("/pizza/1")
+        self.assertIsNone(response.json["photo_url"])
+        self.assertEqual(response.json["photo_status"], "pending")
+
+        self.assertEqual(PhotoManager.process_uploads(), 1)
+
+        db.session.refresh(pizza)
+        uploads = db.session.execute(db.select(PhotoUploadModel)).scalars().fetchall()
+        self.assertEqual(pizza.photo_status, PhotoStatusEnum.ready)
+        self.assertTrue(pizza.photo_url.endswith(".png"))
+        self.assertEqual(s3_mock.objects[PNG_KEY], (PNG_PHOTO, "image/png"))
+        self.assertEqual(len(s3_mock.objects), 7)
+        self.assertEqual(uploads, [])
+
+    @patch("managers.photo.s3_store", new_callable=LocalS3Service)
+    def test_worker_resizes_in_image_pool(self, s3_mock):
+
+        self.client.post("/pizzas", json=self.data, headers=self.headers)
+        db.session.commit()
+
+        pool = BoundedProcessPool(1, 1, 30)
+        self.addCleanup(pool.shutdown)
+        with patch("managers.photo.image_pool", pool):
+            self.assertEqual(PhotoManager.process_uploads(), 1)
+
+        pizza = db.session.execute(db.select(PizzaModel)).scalar_one()
+        self.assertIsNotNone(pool._executor)
+        self.assertEqual(pizza.photo_status, PhotoStatusEnum.ready)
+        self.assertEqual(len(s3_mock.objects), 7)
+
+    def test_worker_module_imported_by_pool_processes(self):
+
+        # Spawned processes run the parent's script again as __mp_main__,
+        # which must not start another worker loop
+        subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import runpy; runpy.run_path('worker.py', run_name='__mp_main__')",
+            ],
+            cwd=ROOT_DIR,
+            env=os.environ,
+            check=True,
+            timeout=30,
+        )
+
+    @patch("managers.photo.s3_store", new_callable=lambda: LocalS3Service(failures=1))
+    def test_photo_upload_retried(self, s3_mock):
+
+        pizza = PizzaFactory(id=1)
+        self.data.pop("name")
+        response = self.client.put("/pizza/1", json=self.data, headers=self.headers)
+        db.session.commit()
+        self.assertEqual(response.status_code, 202)
+
+        PhotoManager.process_uploads()
+
+        upload = db.session.execute(db.select(PhotoUploadModel)).scalar_one()
+        self.assertEqual(upload.attempts, 1)
+        self.assertIsNotNone(upload.last_error)
+
+        db.session.execute(db.update(PhotoUploadModel).values(next_attempt_on=func.now()))
+        db.session.commit()
+        PhotoManager.process_uploads()
+
+        db.session.refresh(pizza)
+        self.assertEqual(pizza.photo_status, PhotoStatusEnum.ready)
+        self.assertNotEqual(pizza.photo_url, "test")
+
+    def test_newer_photo_replaces_staged_upload(self):
+
+        pizza = PizzaFactory(id=1)
+        self.data.pop("name")
+
+        self.client.put("/pizza/1", json=self.data, headers=self.headers)
+        self.client.put("/pizza/1", json=self.data, headers=self.headers)
+
+        uploads = db.session.execute(db.select(PhotoUploadModel)).scalars().fetchall()
+        self.assertEqual(len(uploads), 1)
+        self.assertEqual(pizza.photo_url, "test")
+
+
+@patch("managers.photo.s3_store", new_callable=LocalS3Service)
+class TestPhotoStorage(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        chef = UserFactory(role=RolesEnum.chef)
+        self.headers = {"Authorization": f"Bearer {generate_token(chef)}"}
+
+    def put_photo(self, pizza_id, photo):
+
+        data = {
+            "photo": base64.b64encode(photo).decode("utf-8"),
+            "photo_extension": "png",
+        }
+        response = self.client.put(f"/pizza/{pizza_id}", json=data, headers=self.headers)
+        db.session.commit()
+
+        return response
+
+    def test_same_photo_uploaded_once(self, s3_mock):
+
+        pizzas = [PizzaFactory(id=1), PizzaFactory(id=2, name="Pepperoni")]
+        db.session.commit()
+
+        self.put_photo(1, PNG_PHOTO)
+        self.put_photo(2, PNG_PHOTO)
+
+        photo = db.session.execute(db.select(PhotoModel)).scalar_one()
+        self.assertEqual(len(s3_mock.objects), 7)
+        self.assertEqual(photo.key, PNG_KEY)
+        self.assertEqual({pizza.photo_url for pizza in pizzas}, {photo.url})
+
+    @patch.object(PhotoManager, "async_upload", True)
+    def test_stored_photo_not_staged(self, s3_mock):
+
+        PizzaFactory(id=1)
+        pizza = PizzaFactory(id=2, name="Pepperoni")
+        db.session.commit()
+        self.put_photo(1, PNG_PHOTO)
+        PhotoManager.process_uploads()
+
+        response = self.put_photo(2, PNG_PHOTO)
+
+        uploads = db.session.execute(db.select(PhotoUploadModel)).scalars().fetchall()
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(uploads, [])
+        self.assertEqual(pizza.photo_status, PhotoStatusEnum.ready)
+        self.assertTrue(pizza.photo_url.endswith(PNG_KEY))
+
+    def test_orphaned_photos_collected(self, s3_mock):
+
+        PizzaFactory(id=1)
+        PizzaFactory(id=2, name="Pepperoni")
+        db.session.commit()
+        self.put_photo(1, PNG_PHOTO)
+        self.put_photo(2, PNG_PHOTO)
+        self.put_photo(1, OTHER_PHOTO)
+        self.client.delete("/pizza/2", headers=self.headers)
+        db.session.commit()
+
+        self.assertEqual(PhotoManager.collect_garbage(), 0)
+        self.assertEqual(len(s3_mock.objects), 14)
+
+        with patch.object(PhotoManager, "gc_grace", 0):
+            self.assertEqual(PhotoManager.collect_garbage(), 1)
+
+        photo = db.session.execute(db.select(PhotoModel)).scalar_one()
+        stem = photo.key.removesuffix(".png")
+        self.assertEqual(len(s3_mock.objects), 7)
+        self.assertTrue(all(key.startswith(stem) for key in s3_mock.objects))
+        self.assertNotEqual(photo.key, PNG_KEY)
+
+    def test_photo_replaced_by_async_upload_collected(self, s3_mock):
+
+        PizzaFactory(id=1)
+        db.session.commit()
+        self.put_photo(1, PNG_PHOTO)
+        with patch.object(PhotoManager, "async_upload", True):
+            self.put_photo(1, OTHER_PHOTO)
+
+        # The pending pizza still shows the previous photo, which is kept
+        with patch.object(PhotoManager, "gc_grace", 0):
+            self.assertEqual(PhotoManager.collect_garbage(), 0)
+        self.assertEqual(PhotoManager.process_uploads(), 1)
+        with patch.object(PhotoManager, "gc_grace", 0):
+            self.assertEqual(PhotoManager.collect_garbage(), 1)
+
+        photo = db.session.execute(db.select(PhotoModel)).scalar_one()
+        self.assertNotEqual(photo.key, PNG_KEY)
+        self.assertNotIn(PNG_KEY, s3_mock.objects)
+        self.assertEqual(len(s3_mock.objects), 7)
+
+    def test_readopted_photo_kept(self, s3_mock):
+
+        pizza = PizzaFactory(id=1)
+        db.session.commit()
+        self.put_photo(1, PNG_PHOTO)
+        self.put_photo(1, OTHER_PHOTO)
+        self.put_photo(1, PNG_PHOTO)
+
+        with patch.object(PhotoManager, "gc_grace", 0):
+            self.assertEqual(PhotoManager.collect_garbage(), 1)
+
+        photo = db.session.execute(db.select(PhotoModel)).scalar_one()
+        self.assertIn(PNG_KEY, s3_mock.objects)
+        self.assertEqual(len(s3_mock.objects), 7)
+        self.assertEqual(pizza.photo_url, photo.url)
+        self.assertIsNone(photo.orphaned_on)
+
+
+class TestPhotoVariants(BaseTestCase):
+
+    def test_variants_resized(self):
+
+        variants = render_variants(png_photo("red", size=(2000, 1000)))
+
+        self.assertEqual(len(variants), 6)
+        for (variant, extension), size in (
+            (("thumbnail", "webp"), (160, 80)),
+            (("card", "jpg"), (480, 240)),
+            (("full", "webp"), (1280, 640)),
+        ):
+            with Image.open(io.BytesIO(variants[variant, extension])) as image:
+                self.assertEqual(image.size, size)
+                self.assertEqual(image.format, {"webp": "WEBP", "jpg": "JPEG"}[extension])
+
+    def test_small_photo_not_upscaled(self):
+
+        variants = render_variants(base64.b64encode(PNG_PHOTO).decode("utf-8"))
+
+        with Image.open(io.BytesIO(variants["full", "jpg"])) as image:
+            self.assertEqual(image.size, (640, 480))
+
+    def test_corrupted_photo(self):
+
+        with self.assertRaises(BadRequest) as context:
+            render_variants(PNG_PHOTO[:100])
+
+        self.assertEqual(context.exception.description, "Photo could not be decoded")
+
+
+class TestPhotoStream(BaseTestCase):
+
+    def test_decoded_in_chunks(self):
+
+        encoded = base64.b64encode(PNG_PHOTO[:-1]).decode("utf-8")
+        photo = PhotoStream(encoded, chunk_size=64)
+
+        self.assertEqual(photo.size, len(PNG_PHOTO) - 1)
+        self.assertEqual(photo.read(), PNG_PHOTO[:-1])
+        self.assertEqual(photo.content_type, "image/png")
+
+    def test_line_wrapped_encoding(self):
+
+        encoded = base64.encodebytes(PNG_PHOTO).decode("utf-8").replace("\n", "\r\n")
+        photo = PhotoStream(encoded, chunk_size=64)
+
+        self.assertEqual(photo.size, len(PNG_PHOTO))
+        self.assertEqual(photo.read(), PNG_PHOTO)
+
+    def test_photo_too_large(self):
+
+        encoded = base64.b64encode(PNG_PHOTO).decode("utf-8")
+
+        with self.assertRaises(BadRequest):
+            PhotoStream(encoded, max_size=len(PNG_PHOTO) - 1)
+
+
+class TestMenuCache(BaseTestCase):
+
+    @patch("resources.pizza.PizzaManager.get_pizzas")
+    def test_menu_served_from_cache(self, get_pizzas_mock):
+
+        get_pizzas_mock.return_value = [PizzaFactory(id=1)]
+
+        response = self.client.get("/pizzas")
+        cached_response = self.client.get("/pizzas")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, cached_response.json)
+        get_pizzas_mock.assert_called_once()
+
+    def test_menu_cache_invalidated_on_change(self):
+
+        data = {
+            "name": "Margherita",
+            "size": "s",
+            "price": 4.50,
+            "grammage": 450,
+        }
+        pizza = PizzaFactory(id=1)
+
+        chef = UserFactory(role=RolesEnum.chef)
+        token = generate_token(chef)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        response = self.client.get("/pizzas")
+        self.assertEqual(response.json[0]["sizes"], [])
+        response = self.client.get("/pizza/1")
+        self.assertEqual(response.json["sizes"], [])
+
+        self.client.post("/pizza-sizes", json=data, headers=headers)
+        db.session.commit()
+
+        response = self.client.get("/pizzas")
+        self.assertEqual(len(response.json[0]["sizes"]), 1)
+        response = self.client.get("/pizza/1")
+        self.assertEqual(len(response.json["sizes"]), 1)
+
+    def test_menu_sparse_fields(self):
+
+        PizzaFactory(id=1)
+        PizzaSizeFactory(id=1, pizza_id=1)
+
+        response = self.client.get("/pizzas?fields=id,name")
+        self.assertEqual(response.json, [{"name": "Margherita", "id": 1}])
+
+        response = self.client.get("/pizza/1?fields=sizes")
+        self.assertEqual(list(response.json), ["sizes"])
+        self.assertEqual(len(response.json["sizes"]), 1)
+
+        response = self.client.get("/pizza/1?fields=photo")
+        self.assertEqual(response.status_code, 400)
+
+    def test_menu_not_modified(self):
+
+        pizza = PizzaFactory(id=1)
+
+        response = self.client.get("/pizzas")
+        etag = response.headers["ETag"]
+
+        with count_queries() as statements:
+            response = self.client.get("/pizzas", headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(statements), 0)
+
+        pizza.name = "Capricciosa"
+        menu_cache.invalidate()
+        db.session.commit()
+
+        response = self.client.get("/pizzas", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json[0]["name"], "Capricciosa")
+
+    def test_menu_cache_kept_on_rollback(self):
+
+        pizza = PizzaFactory(id=1)
+
+        response = self.client.get("/pizzas")
+        version = menu_cache.version
+
+        menu_cache.invalidate()
+        db.session.rollback()
+
+        self.assertEqual(menu_cache.version, version)
+
+
 class TestPizzaSizeManagement(BaseTestCase):
 
     def test_create_pizza_size(self):
@@ -0,0 +1,196 @@
+import gzip
+import json
+
+import msgspec
+
+from unittest.mock import MagicMock, patch
+
+from tests.base import BaseTestCase, generate_token
+from tests.factories import (
+    OrderFactory,
+    OrderItemFactory,
+    PizzaFactory,
+    PizzaSizeFactory,
+    UserFactory,
+)
+
+from db import db
+from managers.order import OrderManager
+from managers.pizza import PizzaManager
+from models.enums import RolesEnum, SizeEnum, StatusEnum
+from schemas.response.order import OrderResponseSchema, order_response
+from schemas.response.pizza import PizzaResponseSchema, pizza_response
+from util.response import compressors, json_encoder
+
+
+def marshmallow_json(data):
+
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+class TestPizzaResponse(BaseTestCase):
+
+    def test_same_output_as_marshmallow(self):
+
+        pizza = PizzaFactory(id=1)
+        PizzaSizeFactory(id=1, pizza_id=pizza.id, size=SizeEnum.s, price=4.5)
+        PizzaSizeFactory(id=2, pizza_id=pizza.id, size=SizeEnum.l, price=12, rating=3)
+        db.session.expire_all()
+
+        pizza = PizzaManager.get_pizza(1)
+
+        self.assertEqual(
+            json_encoder.encode(pizza_response(pizza)),
+            marshmallow_json(PizzaResponseSchema().dump(pizza)),
+        )
+
+    def test_menu_response(self):
+
+        PizzaFactory(id=1)
+        PizzaSizeFactory(id=1, pizza_id=1, price=7.355)
+
+        response = self.client.get("/pizzas")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/json")
+        self.assertEqual(
+            response.data,
+            marshmallow_json(
+                PizzaResponseSchema().dump(PizzaManager.get_pizzas(), many=True)
+            ),
+        )
+
+
+class TestOrderResponse(BaseTestCase):
+
+    def test_same_output_as_marshmallow(self):
+
+        user = UserFactory(id=1)
+        PizzaFactory(id=1)
+        PizzaSizeFactory(id=1, pizza_id=1, price=7.5)
+        PizzaSizeFactory(id=2, pizza_id=1, size=SizeEnum.j, price=19.99)
+        OrderFactory(id=1, user_id=user.id, status=StatusEnum.in_transition)
+        OrderItemFactory(order_id=1, pizza_size_id=1, quantity=2)
+        OrderItemFactory(order_id=1, pizza_size_id=2, quantity=1)
+        db.session.expire_all()
+
+        order = OrderManager.get_order(1, with_items=True)
+
+        self.assertEqual(
+            json_encoder.encode(order_response(order)),
+            marshmallow_json(OrderResponseSchema().dump(order)),
+        )
+
+    def test_order_list_response(self):
+
+        user = UserFactory(id=1, role=RolesEnum.deliver)
+        PizzaFactory(id=1)
+        PizzaSizeFactory(id=1, pizza_id=1)
+        OrderFactory(id=1, user_id=user.id)
+        OrderItemFactory(order_id=1, pizza_size_id=1)
+        headers = {"Authorization": f"Bearer {generate_token(user)}"}
+
+        response = self.client.get("/orders", headers=headers)
+
+        orders = OrderManager.get_orders(user, {"limit": 20})[0]
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data,
+            marshmallow_json(
+                {
+                    "orders": OrderResponseSchema().dump(orders, many=True),
+                    "next_cursor": None,
+                }
+            ),
+        )
+
+
+class TestMessagePackResponse(BaseTestCase):
+
+    def test_menu_as_msgpack(self):
+
+        PizzaFactory(id=1)
+        PizzaSizeFactory(id=1, pizza_id=1)
+
+        json_response = self.client.get("/pizzas")
+        response = self.client.get(
+            "/pizzas", headers={"Accept": "application/msgpack"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/msgpack")
+        self.assertIn("Accept", response.vary)
+        self.assertEqual(msgspec.msgpack.decode(response.data), json_response.json)
+
+    def test_orders_as_msgpack(self):
+
+        user = UserFactory(id=1, role=RolesEnum.deliver)
+        PizzaFactory(id=1)
+        PizzaSizeFactory(id=1, pizza_id=1)
+        OrderFactory(id=1, user_id=user.id)
+        OrderItemFactory(order_id=1, pizza_size_id=1)
+        headers = {"Authorization": f"Bearer {generate_token(user)}"}
+
+        json_response = self.client.get("/orders", headers=headers)
+        response = self.client.get(
+            "/orders", headers={**headers, "Accept": "application/msgpack"}
+        )
+
+        self.assertEqual(response.mimetype, "application/msgpack")
+        self.assertEqual(msgspec.msgpack.decode(response.data), json_response.json)
+
+    def test_json_served_by_default(self):
+
+        response = self.client.get("/pizzas", headers={"Accept": "*/*"})
+
+        self.assertEqual(response.mimetype, "application/json")
+
+
+class TestCompressedResponse(BaseTestCase):
+
+    def test_menu_compressed_once_per_version(self):
+
+        for index in range(1, 11):
+            PizzaFactory(id=index, name=f"Pizza {index}")
+        headers = {"Accept-Encoding": "gzip"}
+        plain_response = self.client.get("/pizzas")
+
+        compress_mock = MagicMock(side_effect=gzip.compress)
+        with patch.dict(compressors, {"gzip": compress_mock}):
+            response = self.client.get("/pizzas", headers=headers)
+            cached_response = self.client.get("/pizzas", headers=headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content_encoding, "gzip")
+        self.assertIn("Accept-Encoding", response.vary)
+        self.assertEqual(gzip.decompress(response.data), plain_response.data)
+        self.assertEqual(cached_response.data, response.data)
+        self.assertNotEqual(response.headers["ETag"], plain_response.headers["ETag"])
+        compress_mock.assert_called_once()
+
+    def test_small_response_not_compressed(self):
+
+        PizzaFactory(id=1)
+
+        response = self.client.get("/pizza/1", headers={"Accept-Encoding": "gzip"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.content_encoding)
+
+    def test_compressed_orders_not_modified(self):
+
+        user = UserFactory(id=1, role=RolesEnum.deliver)
+        for index in range(1, 21):
+            OrderFactory(id=index, user_id=user.id)
+        headers = {
+            "Authorization": f"Bearer {generate_token(user)}",
+            "Accept-Encoding": "gzip",
+        }
+
+        response = self.client.get("/orders", headers=headers)
+        self.assertEqual(response.content_encoding, "gzip")
+
+        response = self.client.get(
+            "/orders", headers={**headers, "If-None-Match": response.headers["ETag"]}
+        )
+        self.assertEqual(response.status_code, 304)
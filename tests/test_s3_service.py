@@ -0,0 +1,27 @@
+import io
+
+from unittest.mock import patch
+
+from decouple import config
+
+from services.s3_service import S3Service
+from tests.base import BaseTestCase
+
+
+class TestS3Service(BaseTestCase):
+
+    @patch("services.s3_service.aws_clients")
+    def test_upload_uses_transfer_config(self, clients_mock):
+
+        photo = io.BytesIO(b"photo")
+        url = S3Service().upload_photo(photo, "photo.png", "image/png")
+
+        clients_mock.client.assert_called_once_with("s3")
+        clients_mock.client.return_value.upload_fileobj.assert_called_once_with(
+            photo,
+            config("AWS_BUCKET"),
+            "photo.png",
+            ExtraArgs={"ContentType": "image/png"},
+            Config=clients_mock.transfer_config,
+        )
+        self.assertTrue(url.endswith("/photo.png"))
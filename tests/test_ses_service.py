@@ -0,0 +1,33 @@
+from unittest.mock import patch
+
+from services.ses_service import SESEmail
+from tests.base import BaseTestCase
+
+
+class TestSESEmail(BaseTestCase):
+
+    @patch("services.ses_service.aws_clients")
+    def test_send_emails(self, clients_mock):
+
+        def send_email(Source, Destination, Message):
+            if Destination["ToAddresses"] == ["invalid"]:
+                raise ConnectionError("Invalid address")
+
+        clients_mock.client.return_value.send_email.side_effect = send_email
+        ses_email = SESEmail()
+
+        results = ses_email.send_emails(
+            [("a@b.c", "Subject", "Content"), ("invalid", "Subject", "Content")]
+        )
+        executor = ses_email.executor
+        ses_email.send_emails([("d@e.f", "Subject", "Content")])
+
+        self.assertEqual(
+            results,
+            [
+                {"recipient": "a@b.c", "error": None},
+                {"recipient": "invalid", "error": "Invalid address"},
+            ],
+        )
+        self.assertIs(ses_email.executor, executor)
+        self.assertEqual(executor._max_workers, ses_email.max_workers)
@@ -0,0 +1,33 @@
+from unittest.mock import MagicMock, patch
+
+from services.twilio_service import TwilioSMS
+from tests.base import BaseTestCase
+
+
+class TestTwilioSMS(BaseTestCase):
+
+    @patch("services.twilio_service.Client")
+    def test_send_notifications(self, client_mock):
+
+        def create(body, from_, to):
+            if to == "+0000000000":
+                raise ConnectionError("Invalid number")
+            return MagicMock(sid=f"SM{to}")
+
+        client_mock.return_value.messages.create.side_effect = create
+        twilio_sms = TwilioSMS()
+
+        results = twilio_sms.send_notifications(
+            [("+0748592125", "Message 1"), ("+0000000000", "Message 2")]
+        )
+        sid = twilio_sms.send_notification("+0748592126", "Message 3")
+
+        self.assertEqual(
+            results,
+            [
+                {"recipient": "+0748592125", "sid": "SM+0748592125", "error": None},
+                {"recipient": "+0000000000", "sid": None, "error": "Invalid number"},
+            ],
+        )
+        self.assertEqual(sid, "SM+0748592126")
+        client_mock.assert_called_once()
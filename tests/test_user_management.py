@@ -1,22 +1,35 @@
+import os
+import threading
+
 from unittest.mock import patch
 from werkzeug.security import generate_password_hash
 
+import jwt
+
+from decouple import config
+
+from config import create_app
 from db import db
-from models.enums import RolesEnum
+from managers.auth import AuthManager
+from managers.outbox import OutboxManager
+from models.enums import OutboxKindEnum, OutboxStatusEnum, RolesEnum
+from models.outbox_message import OutboxMessageModel
 from models.user import UserModel
-from tests.base import BaseTestCase, generate_token
+from tests.base import BaseTestCase, count_queries, generate_token
+from util.cache import revocation_list
+from util.executor import hash_pool
+from util.rate_limit import MemoryBucketStore, login_email_limiter, login_ip_limiter
 from tests.factories import UserFactory
 
 
-def mock_exception():
+def mock_exception(*args):
 
     raise Exception("Invalid state")
 
 
 class TestUserManagement(BaseTestCase):
 
-    @patch("managers.user.ses_email")
-    def test_user_register(self, ses_mock):
+    def test_user_register(self):
 
         data = {
             "first_name": "John",
@@ -38,10 +51,18 @@ class TestUserManagement(BaseTestCase):
         self.assertEqual(response.status_code, 201)
         self.assertIn("token", response.json)
         self.assertEqual(len(users), 1)
-        ses_mock.send_email.assert_called_once_with(data["email"], subject, content)
 
-    @patch("managers.user.ses_email")
-    def test_user_register_send_email_failure(self, ses_mock):
+        message = db.session.execute(db.select(OutboxMessageModel)).scalar_one()
+        self.assertEqual(message.kind, OutboxKindEnum.email)
+        self.assertEqual(
+            message.payload,
+            {"recipient": data["email"], "subject": subject, "content": content},
+        )
+
+    @patch("services.ses_service.SESEmail.send_email")
+    def test_user_register_send_email_failure(self, send_email_mock):
+
+        send_email_mock.side_effect = mock_exception
 
         data = {
             "first_name": "John",
@@ -54,15 +75,19 @@ class TestUserManagement(BaseTestCase):
         users = db.session.execute(db.select(UserModel)).scalars().fetchall()
         self.assertEqual(len(users), 0)
 
-        with self.assertRaises(Exception):
-            expected_message = "Error: Invalid state"
-            response = self.client.post("/register", json=data)
-            message = response.json["message"]
+        response = self.client.post("/register", json=data)
+        db.session.commit()
 
-            users = db.session.execute(db.select(UserModel)).scalars().fetchall()
-            self.assertEqual(len(users), 1)
-            self.assertEqual(response.status_code, 500)
-            self.assertEqual(expected_message, message)
+        users = db.session.execute(db.select(UserModel)).scalars().fetchall()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(users), 1)
+
+        OutboxManager.process_messages()
+
+        message = db.session.execute(db.select(OutboxMessageModel)).scalar_one()
+        self.assertEqual(message.status, OutboxStatusEnum.pending)
+        self.assertEqual(message.attempts, 1)
+        self.assertEqual(message.last_error, "Invalid state")
 
     def test_user_register_existing_email_error(self):
 
@@ -246,3 +271,196 @@ class TestUserManagement(BaseTestCase):
 
         self.assertEqual(response.status_code, 409)
         self.assertEqual(expected_message, expected_message)
+
+    def test_authenticated_user_cached(self):
+
+        user = UserFactory(id=1)
+        token = generate_token(user)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        with count_queries() as statements:
+            response = self.client.get("/orders", headers=headers)
+        uncached_queries = len(statements)
+
+        with count_queries() as statements:
+            response = self.client.get("/orders", headers=headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(statements), uncached_queries - 1)
+
+    def test_authenticated_user_cache_invalidated_on_delete(self):
+
+        admin = UserFactory(role=RolesEnum.admin)
+        admin_headers = {"Authorization": f"Bearer {generate_token(admin)}"}
+        user = UserFactory(id=1)
+        headers = {"Authorization": f"Bearer {generate_token(user)}"}
+
+        response = self.client.get("/orders", headers=headers)
+        self.assertEqual(response.status_code, 200)
+
+        self.client.delete("/user/1", headers=admin_headers)
+        db.session.commit()
+
+        response = self.client.get("/orders", headers=headers)
+        self.assertEqual(response.status_code, 401)
+
+
+class TestLoginThrottling(BaseTestCase):
+
+    @patch.object(login_email_limiter, "capacity", 2)
+    def test_user_login_throttled_by_email(self):
+
+        data = {"email": "chushko23@abv.bg", "password": "#@KL0305"}
+        UserFactory(email=data["email"])
+
+        for _ in range(2):
+            response = self.client.post("/login", json=data)
+            self.assertEqual(response.status_code, 404)
+
+        with patch.object(hash_pool, "run") as run_mock:
+            with count_queries() as statements:
+                response = self.client.post(
+                    "/login", json={**data, "email": "Chushko23@abv.bg"}
+                )
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(len(statements), 0)
+        run_mock.assert_not_called()
+
+        response = self.client.post(
+            "/login", json={**data, "email": "other@abv.bg"}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    @patch.object(login_ip_limiter, "capacity", 3)
+    def test_user_login_throttled_by_client_ip(self):
+
+        for index in range(3):
+            data = {"email": f"user{index}@abv.bg", "password": "#@KL0305"}
+            response = self.client.post("/login", json=data)
+            self.assertEqual(response.status_code, 404)
+
+        data = {"email": "user4@abv.bg", "password": "#@KL0305"}
+        response = self.client.post("/login", json=data)
+
+        self.assertEqual(response.status_code, 429)
+
+    @patch.object(login_ip_limiter, "capacity", 1)
+    @patch.dict(os.environ, {"TRUSTED_PROXY_HOPS": "1"})
+    def test_user_login_throttled_by_forwarded_client_ip(self):
+
+        client = create_app(config("TEST_ENVIRONMENT")).test_client()
+        data = {"email": "chushko23@abv.bg", "password": "#@KL0305"}
+
+        for address, status_code in (
+            ("203.0.113.1", 404),
+            ("203.0.113.2", 404),
+            ("203.0.113.1", 429),
+        ):
+            response = client.post(
+                "/login", json=data, headers={"X-Forwarded-For": address}
+            )
+            self.assertEqual(response.status_code, status_code)
+
+    def test_memory_bucket_store_refills_and_evicts(self):
+
+        store = MemoryBucketStore(max_size=2)
+
+        self.assertTrue(store.take("a", 1, 1000))
+        self.assertTrue(store.take("b", 1, 0.001))
+        self.assertFalse(store.take("b", 1, 0.001))
+
+        store.take("c", 1, 0.001)
+        store.take("d", 1, 0.001)
+        self.assertTrue(store.take("b", 1, 0.001))
+
+
+class TestPasswordHashing(BaseTestCase):
+
+    def test_user_login_hashes_in_process_pool(self):
+
+        user = UserFactory(password="#@KL0305")
+        data = {"email": user.email, "password": "#@KL0305"}
+
+        with patch.object(hash_pool, "run", wraps=hash_pool.run) as run_mock:
+            response = self.client.post("/login", json=data)
+
+        self.assertEqual(response.status_code, 200)
+        run_mock.assert_called_once()
+
+    @patch.object(hash_pool, "_slots", threading.BoundedSemaphore(1))
+    def test_user_register_hash_queue_full(self):
+
+        data = {
+            "first_name": "John",
+            "last_name": "Doe",
+            "email": "chushko23@abv.bg",
+            "password": "#@KL0305",
+            "phone": "+0748592125",
+        }
+        hash_pool._slots.acquire()
+
+        response = self.client.post("/register", json=data)
+
+        users = db.session.execute(db.select(UserModel)).scalars().fetchall()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(users), 0)
+
+
+@patch.object(AuthManager, "role_tokens", True)
+class TestRoleTokens(BaseTestCase):
+
+    def test_token_carries_role_and_version(self):
+
+        user = UserFactory(role=RolesEnum.deliver)
+        payload = jwt.decode(
+            generate_token(user), config("SECRET_KEY"), algorithms=["HS256"]
+        )
+
+        self.assertEqual(payload["role"], "deliver")
+        self.assertEqual(payload["ver"], 0)
+
+    def test_read_endpoint_authorized_without_user_lookup(self):
+
+        user = UserFactory(role=RolesEnum.deliver)
+        headers = {"Authorization": f"Bearer {generate_token(user)}"}
+        revocation_list.refresh()
+
+        with count_queries() as statements:
+            response = self.client.get("/orders", headers=headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any("FROM users" in statement for statement in statements))
+
+    def test_token_revoked_on_password_change(self):
+
+        data = {"old_password": "#@KL0305", "new_password": "#@PL0405"}
+        user = UserFactory(password="#@KL0305")
+        headers = {"Authorization": f"Bearer {generate_token(user)}"}
+
+        response = self.client.post("/user/change-password", json=data, headers=headers)
+        self.assertEqual(response.status_code, 204)
+        db.session.commit()
+
+        response = self.client.get("/orders", headers=headers)
+        self.assertEqual(response.status_code, 401)
+
+        headers = {"Authorization": f"Bearer {generate_token(user)}"}
+        response = self.client.get("/orders", headers=headers)
+        self.assertEqual(response.status_code, 200)
+
+    def test_token_revoked_on_delete_across_workers(self):
+
+        admin = UserFactory(role=RolesEnum.admin)
+        admin_headers = {"Authorization": f"Bearer {generate_token(admin)}"}
+        user = UserFactory(id=1)
+        headers = {"Authorization": f"Bearer {generate_token(user)}"}
+
+        self.client.delete("/user/1", headers=admin_headers)
+        db.session.commit()
+
+        # Another worker only learns about the revocation from the database
+        revocation_list.clear()
+
+        response = self.client.get("/orders", headers=headers)
+        self.assertEqual(response.status_code, 401)
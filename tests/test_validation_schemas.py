@@ -1,8 +1,14 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+from flask import Request
+
 from tests.base import BaseTestCase, generate_token
 from tests.factories import UserFactory
 
 from db import db
-from models.enums import RolesEnum
+from managers.pizza import PizzaManager
+from models.enums import RolesEnum, SizeEnum
 from models.order import OrderModel
 from models.pizza import PizzaModel
 from models.pizza_size import PizzaSizeModel
@@ -429,6 +435,33 @@ class TestPizzaSizeRequestSchema(BaseTestCase):
         pizza_size = db.session.execute(db.select(PizzaSizeModel)).scalars().fetchall()
         self.assertEqual(len(pizza_size), 0)
 
+    def test_loaded_payload_passed_to_manager(self):
+
+        data = {"name": "Margherita", "size": "l", "grammage": 100, "price": "5.5"}
+
+        user = UserFactory(role=RolesEnum.chef)
+        token = generate_token(user)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        with (
+            patch.object(PizzaManager, "add_pizza_size") as manager_mock,
+            patch.object(
+                Request, "get_json", autospec=True, side_effect=Request.get_json
+            ) as get_json_mock,
+        ):
+            response = self.client.post("/pizza-sizes", json=data, headers=headers)
+
+        self.assertEqual(response.status_code, 201)
+        get_json_mock.assert_called_once()
+        manager_mock.assert_called_once_with(
+            {
+                "name": "Margherita",
+                "size": SizeEnum.l,
+                "grammage": 100,
+                "price": Decimal("5.50"),
+            }
+        )
+
 
 class TestOrderRequestSchema(BaseTestCase):
 
@@ -0,0 +1,227 @@
+import threading
+import time
+
+from collections import OrderedDict
+
+from decouple import config
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from db import db
+from models.token_revocation import TokenRevocationModel
+
+
+class MenuCache:
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self.version = 0
+        self._lock = threading.Lock()
+        self._menu = None
+        self._pizzas = {}
+        self._representations = {}
+        self._loaded_at = 0.0
+
+    def _is_fresh(self):
+
+        return time.monotonic() - self._loaded_at < self.ttl
+
+    def get_menu(self, loader):
+
+        with self._lock:
+            version = self.version
+            if self._menu is not None and self._is_fresh():
+                return self._menu
+
+        menu = loader()
+
+        with self._lock:
+            # Only keep the result if the catalog did not change while it was
+            # being loaded, otherwise a stale menu would be cached under the new version
+            if version == self.version:
+                if not self._is_fresh():
+                    self._pizzas = {}
+                self._menu = menu
+                self._pizzas.update({pizza.id: pizza for pizza in menu})
+                self._representations = {}
+                self._loaded_at = time.monotonic()
+
+        return menu
+
+    def get_pizza(self, pizza_id, loader):
+
+        with self._lock:
+            version = self.version
+            if self._is_fresh() and pizza_id in self._pizzas:
+                return self._pizzas[pizza_id]
+
+        pizza = loader()
+
+        with self._lock:
+            if version == self.version:
+                if not self._is_fresh():
+                    self._menu = None
+                    self._pizzas = {}
+                    self._representations = {}
+                    self._loaded_at = time.monotonic()
+                self._pizzas[pizza_id] = pizza
+
+        return pizza
+
+    def get_representation(self, key, build):
+
+        # Encoded and compressed bodies are kept until the menu is reloaded,
+        # and only if it was not reloaded while they were being built
+        with self._lock:
+            state = (self.version, self._loaded_at)
+            if self._is_fresh() and key in self._representations:
+                return self._representations[key]
+
+        representation = build()
+
+        with self._lock:
+            if state == (self.version, self._loaded_at):
+                self._representations[key] = representation
+
+        return representation
+
+    def invalidate(self):
+
+        # The version is bumped once the surrounding transaction is committed,
+        # so readers can't cache the menu as it was before the change
+        db.session.info["menu_changed"] = True
+
+    def bump(self):
+
+        with self._lock:
+            self.version += 1
+            self._menu = None
+            self._pizzas = {}
+            self._representations = {}
+            self._loaded_at = 0.0
+
+
+class PrincipalCache:
+
+    def __init__(self, ttl: int, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, user_id):
+
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+
+            principal, expires_on = entry
+            if expires_on < time.monotonic():
+                del self._entries[user_id]
+                return None
+
+            self._entries.move_to_end(user_id)
+            return principal
+
+    def set(self, user_id, principal):
+
+        with self._lock:
+            self._entries[user_id] = (principal, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user_id)
+
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+
+        # Dropped right away and once more after the commit, in case a
+        # concurrent request cached the user again in between
+        self.discard(user_id)
+        db.session.info.setdefault("principals_changed", set()).add(user_id)
+
+    def discard(self, user_id):
+
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+
+        with self._lock:
+            self._entries.clear()
+
+
+class RevocationList:
+
+    def __init__(self, refresh_interval: int):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._refreshed_at = 0.0
+
+    def refresh(self):
+
+        # Only unexpired revocations are kept, one minimum version per user
+        rows = db.session.execute(
+            db.select(
+                TokenRevocationModel.user_id, func.max(TokenRevocationModel.min_version)
+            )
+            .where(TokenRevocationModel.expires_on > func.now())
+            .group_by(TokenRevocationModel.user_id)
+        ).all()
+
+        with self._lock:
+            self._versions = dict(rows)
+            self._refreshed_at = time.monotonic()
+
+    def is_revoked(self, user_id, version):
+
+        if time.monotonic() - self._refreshed_at >= self.refresh_interval:
+            self.refresh()
+
+        return version < self._versions.get(user_id, 0)
+
+    def revoke(self, user_id, min_version):
+
+        revoked = db.session.info.setdefault("tokens_revoked", {})
+        revoked[user_id] = max(min_version, revoked.get(user_id, 0))
+
+    def apply(self, user_id, min_version):
+
+        with self._lock:
+            self._versions[user_id] = max(min_version, self._versions.get(user_id, 0))
+
+    def clear(self):
+
+        with self._lock:
+            self._versions = {}
+            self._refreshed_at = 0.0
+
+
+menu_cache = MenuCache(config("MENU_CACHE_TTL", default=30, cast=int))
+principal_cache = PrincipalCache(
+    config("AUTH_CACHE_TTL", default=60, cast=int),
+    config("AUTH_CACHE_SIZE", default=10000, cast=int),
+)
+revocation_list = RevocationList(config("REVOCATION_REFRESH_INTERVAL", default=10, cast=int))
+
+
+@event.listens_for(Session, "after_commit")
+def apply_cache_invalidations(session):
+
+    if session.info.pop("menu_changed", False):
+        menu_cache.bump()
+
+    for user_id in session.info.pop("principals_changed", ()):
+        principal_cache.discard(user_id)
+
+    for user_id, min_version in session.info.pop("tokens_revoked", {}).items():
+        revocation_list.apply(user_id, min_version)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_cache_invalidations(session):
+
+    session.info.pop("menu_changed", None)
+    session.info.pop("principals_changed", None)
+    session.info.pop("tokens_revoked", None)
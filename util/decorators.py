@@ -1,8 +1,8 @@
 import functools
 
 from flask import request
-from marshmallow import Schema
-from werkzeug.exceptions import BadRequest, Unauthorized
+from marshmallow import Schema, ValidationError
+from werkzeug.exceptions import BadRequest, TooManyRequests, Unauthorized
 
 from managers.auth import auth
 from models.enums import RolesEnum
@@ -25,21 +25,39 @@ def permission_required(roles: list[RolesEnum]):
     return decorator
 
 
-def validate_schema(schema: Schema):
+def rate_limit(limiter, key_func):
     def decorator(func):
         functools.wraps(func)
 
         def wrapper(*args, **kwargs):
 
-            data = request.get_json()
-            schema_obj = schema()
-            errors = schema_obj.validate(data)
-
-            if errors:
-                raise BadRequest(f"Invalid payload: {errors}")
+            key = key_func()
+            if key is not None and not limiter.allow(key):
+                raise TooManyRequests("Too many requests, please try again later")
 
             return func(*args, **kwargs)
 
         return wrapper
 
     return decorator
+
+
+def validate_schema(schema: Schema):
+    # One schema instance is built per endpoint and reused by every request
+    schema_obj = schema()
+
+    def decorator(func):
+        functools.wraps(func)
+
+        def wrapper(*args, **kwargs):
+
+            try:
+                data = schema_obj.load(request.get_json())
+            except ValidationError as ex:
+                raise BadRequest(f"Invalid payload: {ex.messages}")
+
+            return func(*args, data=data, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,74 @@
+import multiprocessing
+import threading
+
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+from decouple import config
+from werkzeug.exceptions import ServiceUnavailable
+
+
+class BoundedProcessPool:
+
+    def __init__(self, size: int, queue_limit: int, timeout: float):
+        self.size = size
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(size + queue_limit)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+
+        # Spawned workers don't inherit the locks held by the server threads
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.size,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+
+        return self._executor
+
+    def run(self, func, *args, **kwargs):
+
+        if not self.size:
+            return func(*args, **kwargs)
+
+        # A full queue is rejected right away instead of piling up requests
+        # that would time out anyway
+        if not self._slots.acquire(blocking=False):
+            raise ServiceUnavailable("Server is busy, please try again later")
+
+        try:
+            future = self.executor.submit(func, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise ServiceUnavailable("Server is busy, please try again later")
+
+    def shutdown(self):
+
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+hash_pool = BoundedProcessPool(
+    config("HASH_POOL_SIZE", default=2, cast=int),
+    config("HASH_QUEUE_LIMIT", default=32, cast=int),
+    config("HASH_TIMEOUT", default=10, cast=float),
+)
+image_pool = BoundedProcessPool(
+    config("IMAGE_POOL_SIZE", default=2, cast=int),
+    config("IMAGE_QUEUE_LIMIT", default=8, cast=int),
+    config("IMAGE_TIMEOUT", default=30, cast=float),
+)
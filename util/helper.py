@@ -1,12 +1,50 @@
 import base64
 
+from datetime import datetime
+from decimal import Decimal
+
 from werkzeug.exceptions import BadRequest
 
 
-def decode_photo(path, encoded_string):
+def encode_cursor(created_on: datetime, record_id: int):
+
+    value = f"{created_on.isoformat()}|{record_id}"
+    return base64.urlsafe_b64encode(value.encode("utf-8")).decode("utf-8")
+
+
+def decode_cursor(cursor: str):
+
+    try:
+        created_on, record_id = (
+            base64.urlsafe_b64decode(cursor.encode("utf-8")).decode("utf-8").split("|")
+        )
+        return datetime.fromisoformat(created_on), int(record_id)
+    except Exception:
+        raise BadRequest("Invalid cursor")
+
+
+def format_price(value):
+
+    # Rounded the same way as the marshmallow Decimal fields with places=2
+    return Decimal(str(value)).quantize(Decimal("0.01"))
+
+
+def parse_fields(value, allowed):
+
+    if value is None:
+        return None
+
+    fields = {field.strip() for field in value.split(",") if field.strip()}
+    unknown = fields.difference(allowed)
+    if not fields or unknown:
+        raise BadRequest(f"Invalid fields: {", ".join(sorted(unknown)) or value}")
+
+    return frozenset(fields)
+
+
+def select_fields(struct, fields):
+
+    if fields is None:
+        return struct
 
-    with open(path, "wb") as f:
-        try:
-            f.write(base64.b64decode(encoded_string.encode("utf-8")))
-        except Exception:
-            raise BadRequest("Invalid photo encoding")
+    return type(struct)(**{field: getattr(struct, field) for field in fields})
@@ -0,0 +1,145 @@
+import base64
+import binascii
+import hashlib
+import io
+
+from decouple import config
+from PIL import Image, ImageOps
+from werkzeug.exceptions import BadRequest
+
+# Magic bytes of the accepted formats, mapped to their file extension
+photo_signatures = {
+    b"\x89PNG\r\n\x1a\n": "png",
+    b"\xff\xd8\xff": "jpg",
+}
+photo_content_types = {"png": "image/png", "jpg": "image/jpeg", "webp": "image/webp"}
+
+# Longest side in pixels of each variant, and the formats each one is saved in
+photo_variants = {"thumbnail": 160, "card": 480, "full": 1280}
+variant_formats = {"webp": "WEBP", "jpg": "JPEG"}
+
+# Line-wrapped (MIME) base64 is accepted, its whitespace is dropped while decoding
+whitespace = " \t\n\r\v\f"
+strip_whitespace = str.maketrans("", "", whitespace)
+
+PHOTO_MAX_SIZE = config("PHOTO_MAX_SIZE", default=5 * 1024 * 1024, cast=int)
+PHOTO_VARIANT_QUALITY = config("PHOTO_VARIANT_QUALITY", default=80, cast=int)
+
+
+class PhotoStream(io.RawIOBase):
+
+    def __init__(self, encoded: str, max_size: int = PHOTO_MAX_SIZE, chunk_size=65536):
+        self.encoded = encoded
+        self.chunk_size = chunk_size - chunk_size % 4
+        self.position = 0
+        self.pending = ""
+        self.buffer = b""
+
+        # The decoded size is known from the encoded length, so oversized
+        # photos are rejected before anything is decoded
+        length = len(encoded) - sum(encoded.count(char) for char in whitespace)
+        if length % 4:
+            raise BadRequest("Invalid photo encoding")
+        padding = encoded[-64:].translate(strip_whitespace)[-2:].count("=")
+        self.size = length // 4 * 3 - padding
+        if self.size > max_size:
+            raise BadRequest(f"Photo should not be larger than {max_size} bytes")
+
+        self.buffer = self.decode_chunk()
+        self.extension = next(
+            (
+                extension
+                for signature, extension in photo_signatures.items()
+                if self.buffer.startswith(signature)
+            ),
+            None,
+        )
+        if self.extension is None:
+            raise BadRequest("Unsupported photo format")
+
+    def digest(self):
+
+        # Hashed in a first pass over the encoded photo, which is then rewound
+        # for the upload
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: self.read(self.chunk_size), b""):
+            digest.update(chunk)
+        self.rewind()
+
+        return digest.hexdigest()
+
+    def rewind(self):
+
+        self.position = 0
+        self.pending = ""
+        self.buffer = self.decode_chunk()
+
+    @property
+    def content_type(self):
+
+        return photo_content_types[self.extension]
+
+    def decode_chunk(self):
+
+        chunk = self.encoded[self.position : self.position + self.chunk_size]
+        self.position += len(chunk)
+
+        # Characters that don't fill a 4 character group after the whitespace
+        # is dropped are carried over to the next chunk
+        chunk = self.pending + chunk.translate(strip_whitespace)
+        self.pending = ""
+        if self.position < len(self.encoded):
+            size = len(chunk) - len(chunk) % 4
+            chunk, self.pending = chunk[:size], chunk[size:]
+
+        try:
+            return base64.b64decode(chunk, validate=True)
+        except (binascii.Error, ValueError):
+            raise BadRequest("Invalid photo encoding")
+
+    def readable(self):
+
+        return True
+
+    def readinto(self, buffer):
+
+        while not self.buffer and self.position < len(self.encoded):
+            self.buffer = self.decode_chunk()
+
+        size = min(len(buffer), len(self.buffer))
+        buffer[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+
+        return size
+
+
+def variant_key(key, variant, extension):
+
+    return f"{key.rsplit(".", 1)[0]}/{variant}.{extension}"
+
+
+def render_variants(content: bytes | str, quality: int = PHOTO_VARIANT_QUALITY):
+
+    # Runs in the image pool, so it only takes and returns plain values.
+    # Request photos arrive as their base64 text and are decoded here.
+    if isinstance(content, str):
+        content = base64.b64decode(content)
+
+    try:
+        with Image.open(io.BytesIO(content)) as image:
+            image = ImageOps.exif_transpose(image).convert("RGB")
+    except (OSError, Image.DecompressionBombError):
+        raise BadRequest("Photo could not be decoded")
+
+    variants = {}
+    for variant, size in photo_variants.items():
+        resized = image.copy()
+        # Never upscales, a small photo keeps its size in the larger variants
+        resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+        for extension, image_format in variant_formats.items():
+            output = io.BytesIO()
+            resized.save(output, image_format, quality=quality)
+            variants[variant, extension] = output.getvalue()
+
+    return variants
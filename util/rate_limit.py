@@ -0,0 +1,122 @@
+import threading
+import time
+
+from collections import OrderedDict
+
+from decouple import config
+from flask import request
+
+
+class MemoryBucketStore:
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def take(self, key, capacity, rate):
+
+        now = time.monotonic()
+
+        with self._lock:
+            tokens, updated_on = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_on) * rate)
+
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+
+            # The least recently used buckets are evicted first, an evicted
+            # bucket simply starts over full
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_size:
+                self._buckets.popitem(last=False)
+
+        return allowed
+
+    def clear(self):
+
+        with self._lock:
+            self._buckets.clear()
+
+
+class RedisBucketStore:
+    script = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local time = redis.call("TIME")
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "updated_on")
+local tokens = tonumber(bucket[1]) or capacity
+local updated_on = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + (now - updated_on) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call("HSET", KEYS[1], "tokens", tokens, "updated_on", now)
+redis.call("EXPIRE", KEYS[1], math.ceil(capacity / rate))
+return allowed
+"""
+
+    def __init__(self, url: str):
+        # Only needed when the buckets are shared between workers
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self._take = self.client.register_script(self.script)
+
+    def take(self, key, capacity, rate):
+
+        return bool(self._take(keys=[key], args=[capacity, rate]))
+
+    def clear(self):
+
+        pass
+
+
+class RateLimiter:
+
+    def __init__(self, name: str, store, limit: int, period: int):
+        self.name = name
+        self.store = store
+        self.capacity = limit
+        self.rate = limit / period
+
+    def allow(self, key):
+
+        return self.store.take(f"{self.name}:{key}", self.capacity, self.rate)
+
+
+def client_ip():
+
+    return request.remote_addr
+
+
+def login_email():
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict) and isinstance(data.get("email"), str):
+        return data["email"].strip().lower()
+
+
+redis_url = config("RATE_LIMIT_REDIS_URL", default="")
+rate_limit_store = (
+    RedisBucketStore(redis_url)
+    if redis_url
+    else MemoryBucketStore(config("RATE_LIMIT_SIZE", default=10000, cast=int))
+)
+login_period = config("LOGIN_RATE_LIMIT_PERIOD", default=60, cast=int)
+login_ip_limiter = RateLimiter(
+    "login:ip",
+    rate_limit_store,
+    config("LOGIN_RATE_LIMIT_IP", default=20, cast=int),
+    login_period,
+)
+login_email_limiter = RateLimiter(
+    "login:email",
+    rate_limit_store,
+    config("LOGIN_RATE_LIMIT_EMAIL", default=5, cast=int),
+    login_period,
+)
@@ -0,0 +1,125 @@
+import gzip
+import hashlib
+
+import msgspec
+
+from decouple import config
+from flask import current_app, request
+from werkzeug.http import is_resource_modified
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+json_encoder = msgspec.json.Encoder()
+msgpack_encoder = msgspec.msgpack.Encoder()
+
+# The first media type is served when the client has no preference
+encoders = {
+    "application/json": json_encoder,
+    "application/msgpack": msgpack_encoder,
+}
+
+compress_min_size = config("COMPRESS_MIN_SIZE", default=1024, cast=int)
+gzip_level = config("COMPRESS_GZIP_LEVEL", default=6, cast=int)
+brotli_quality = config("COMPRESS_BROTLI_QUALITY", default=5, cast=int)
+
+# Preferred first when the client accepts several with the same quality
+compressors = {"gzip": lambda body: gzip.compress(body, gzip_level, mtime=0)}
+if brotli is not None:
+    compressors = {
+        "br": lambda body: brotli.compress(body, quality=brotli_quality),
+        **compressors,
+    }
+
+
+def response_mimetype():
+
+    return request.accept_mimetypes.best_match(encoders, default="application/json")
+
+
+def response_encoding(size):
+
+    if size < compress_min_size:
+        return None
+
+    return request.accept_encodings.best_match(compressors)
+
+
+def encoded_etag(etag, encoding):
+
+    # Compressed bodies are other representations, so they get their own tags
+    return f"{etag}-{encoding}" if encoding else etag
+
+
+def make_etag(*parts):
+
+    # Other formats and query parameters are other representations, so they
+    # get their own tags
+    value = repr((response_mimetype(), request.query_string, *parts))
+    return hashlib.blake2b(value.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class Representation:
+
+    def __init__(self, payload, etag=None):
+        self.mimetype = response_mimetype()
+        self.body = encoders[self.mimetype].encode(payload)
+        self.etag = etag or hashlib.blake2b(self.body, digest_size=16).hexdigest()
+        self._compressed = {}
+
+    def compressed(self, encoding):
+
+        # Cached representations are compressed once per encoding
+        if encoding not in self._compressed:
+            self._compressed[encoding] = compressors[encoding](self.body)
+
+        return self._compressed[encoding]
+
+
+def not_modified(etag, last_modified=None):
+
+    for encoding in (None, *compressors):
+        candidate = encoded_etag(etag, encoding)
+        if not is_resource_modified(
+            request.environ, etag=candidate, last_modified=last_modified
+        ):
+            response = current_app.response_class(status=304)
+            response.set_etag(candidate)
+            response.last_modified = last_modified
+            response.vary.update(("Accept", "Accept-Encoding"))
+            return response
+
+    return None
+
+
+def send_representation(representation, status=200, last_modified=None):
+
+    encoding = response_encoding(len(representation.body))
+    body = (
+        representation.compressed(encoding) if encoding else representation.body
+    )
+
+    response = current_app.response_class(
+        body, status=status, mimetype=representation.mimetype
+    )
+    if encoding:
+        response.content_encoding = encoding
+    response.vary.update(("Accept", "Accept-Encoding"))
+
+    if status == 200:
+        response.set_etag(encoded_etag(representation.etag, encoding))
+        response.last_modified = last_modified
+        response.make_conditional(request)
+
+    return response
+
+
+def encode_response(payload, status=200, etag=None, last_modified=None):
+
+    # Encoded straight to bytes, bypassing the marshmallow dump and the
+    # flask-restful JSON representation
+    return send_representation(
+        Representation(payload, etag), status=status, last_modified=last_modified
+    )
@@ -0,0 +1,50 @@
+import time
+
+from decouple import config
+
+from config import create_app
+from db import db
+from managers.outbox import OutboxManager
+from managers.photo import PhotoManager
+
+
+def main():
+
+    # Only run when started as a script, the image pool's spawned processes
+    # import this module again and must not start their own loop
+    app = create_app(config("DEV_ENVIRONMENT"))
+    poll_interval = config("OUTBOX_POLL_INTERVAL", default=1, cast=float)
+
+    with app.app_context():
+        while True:
+            try:
+                processed = OutboxManager.process_messages()
+            except Exception:
+                db.session.rollback()
+                app.logger.exception("Processing outbox messages failed")
+                processed = 0
+
+            try:
+                processed += OutboxManager.purge_messages()
+            except Exception:
+                db.session.rollback()
+                app.logger.exception("Purging sent outbox messages failed")
+
+            try:
+                processed += PhotoManager.process_uploads()
+            except Exception:
+                db.session.rollback()
+                app.logger.exception("Processing photo uploads failed")
+
+            try:
+                processed += PhotoManager.collect_garbage()
+            except Exception:
+                db.session.rollback()
+                app.logger.exception("Collecting orphaned photos failed")
+
+            if not processed:
+                time.sleep(poll_interval)
+
+
+if __name__ == "__main__":
+    main()